@@ -1,15 +1,19 @@
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+from flask_caching import Cache
 from werkzeug.utils import secure_filename
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 import json
-import hashlib
+import multiprocessing
+import threading
+import uuid
 
-from forensics.sybil_attack import SybilAttackDetector
-from forensics.position_falsification import PositionFalsificationDetector
 from utils.pdf_generator import PDFReportGenerator
 from utils.file_handler import FileHandler
+from utils.timestamps import format_now
 from config import Config
 
 app = Flask(__name__)
@@ -18,12 +22,24 @@ CORS(app, origins=[
     "https://autoforensics.onrender.com"
 ])
 
+UPLOAD_DIR = app.config['UPLOAD_FOLDER']
+
 # Initialize components
-file_handler = FileHandler(app.config['UPLOAD_FOLDER'])
+cache = Cache(app)
+file_handler = FileHandler(UPLOAD_DIR, app.config['ALLOWED_EXTENSIONS'])
 pdf_generator = PDFReportGenerator()
 
+# Background PDF rendering. Job state lives in the shared cache under
+# pdf_job:<job_id>, so any worker can answer the status and result polls
+pdf_executor = ThreadPoolExecutor(max_workers=app.config['PDF_WORKERS'])
+
+# Process pool for running both detectors side by side (created on first
+# use, replaced if one of its workers dies)
+analysis_executor = None
+analysis_executor_lock = threading.Lock()
+
 # Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -47,24 +63,19 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
 
-        if file and file_handler.allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+        # Sanitize once and validate the name that will actually be stored
+        filename = secure_filename(file.filename)
 
-            # Save file to uploads
-            file.save(filepath)
-
-            # Calculate SHA256 hash of the saved file (backend authoritative)
-            sha256 = hashlib.sha256()
-            with open(filepath, 'rb') as fh:
-                for chunk in iter(lambda: fh.read(8192), b''):
-                    sha256.update(chunk)
-            file_hash = sha256.hexdigest()
+        if file and file_handler.allowed_file(filename):
+            timestamp = format_now()
+            unique_filename = f"{timestamp}_{filename}"
+            filepath = os.path.join(UPLOAD_DIR, unique_filename)
 
-            # File size in bytes
-            file_size = os.path.getsize(filepath)
+            # Stream file to uploads, computing the backend-authoritative
+            # SHA256 hash and size in the same pass
+            file_hash, file_size = file_handler.save_upload(
+                file, filepath, app.config['UPLOAD_CHUNK_SIZE']
+            )
 
             # Optional case details sent from frontend
             case_details = request.form.get('case_details') or request.form.get('case') or None
@@ -95,38 +106,31 @@ def analyze_sybil_attack():
         if not filename:
             return jsonify({'error': 'No filename provided'}), 400
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(UPLOAD_DIR, filename)
 
-        # Recalculate backend-authoritative file hash and size
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as fh:
-            for chunk in iter(lambda: fh.read(8192), b''):
-                sha256.update(chunk)
-        file_hash = sha256.hexdigest()
-        file_size = os.path.getsize(filepath)
-
-        # Case details may be sent in JSON
-        case_details = data.get('case_details') or data.get('case') or None
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
 
         # Recalculate backend-authoritative file hash and size
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as fh:
-            for chunk in iter(lambda: fh.read(8192), b''):
-                sha256.update(chunk)
-        file_hash = sha256.hexdigest()
+        file_hash = file_handler.hash_file(filepath)
         file_size = os.path.getsize(filepath)
 
         # Case details may be sent in JSON
         case_details = data.get('case_details') or data.get('case') or None
         
-        if not os.path.exists(filepath):
-            return jsonify({'error': 'File not found'}), 404
-        
-        # Initialize detector
-        detector = SybilAttackDetector()
-        
-        # Perform analysis
-        analysis_results = detector.analyze(filepath)
+        # A triage run stops each check once the threat level is settled
+        triage = bool(data.get('triage'))
+
+        # Reuse results for identical file contents, otherwise run the detector
+        cache_key = _analysis_cache_key('sybil', file_hash, triage)
+        analysis_results = _cached_analysis(cache_key, filepath)
+        if analysis_results is None:
+            # Imported here so workers only load the numeric stack once an analysis runs
+            from forensics.sybil_attack import SybilAttackDetector, CRITICAL_FINDINGS
+            detector = SybilAttackDetector()
+            analysis_results = detector.analyze(filepath, CRITICAL_FINDINGS if triage else None)
+            if not analysis_results.get('error'):
+                cache.set(cache_key, analysis_results)
         
         # Generate report data
         report_data = {
@@ -134,7 +138,7 @@ def analyze_sybil_attack():
             'filename': data.get('original_filename', filename),
             'timestamp': datetime.now().isoformat(),
             'analysis_results': analysis_results,
-            'report_id': f"SYBIL_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'report_id': f"SYBIL_{format_now()}",
             # 'caseNumber': case_details.get('caseNumber') if case_details else 1212,
         }
         
@@ -157,27 +161,28 @@ def analyze_position_falsification():
         if not filename:
             return jsonify({'error': 'No filename provided'}), 400
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(UPLOAD_DIR, filename)
+
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
 
         # Recalculate backend-authoritative file hash and size
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as fh:
-            for chunk in iter(lambda: fh.read(8192), b''):
-                sha256.update(chunk)
-        file_hash = sha256.hexdigest()
+        file_hash = file_handler.hash_file(filepath)
         file_size = os.path.getsize(filepath)
 
         # Case details may be sent in JSON
         case_details = data.get('case_details') or data.get('case') or None
         
-        if not os.path.exists(filepath):
-            return jsonify({'error': 'File not found'}), 404
-        
-        # Initialize detector
-        detector = PositionFalsificationDetector()
-        
-        # Perform analysis
-        analysis_results = detector.analyze(filepath)
+        # Reuse results for identical file contents, otherwise run the detector
+        cache_key = _analysis_cache_key('position', file_hash)
+        analysis_results = _cached_analysis(cache_key, filepath)
+        if analysis_results is None:
+            # Imported here so workers only load the numeric stack once an analysis runs
+            from forensics.position_falsification import PositionFalsificationDetector
+            detector = PositionFalsificationDetector()
+            analysis_results = detector.analyze(filepath)
+            if not analysis_results.get('error'):
+                cache.set(cache_key, analysis_results)
         
         # Generate report data
         report_data = {
@@ -185,7 +190,7 @@ def analyze_position_falsification():
             'filename': data.get('original_filename', filename),
             'timestamp': datetime.now().isoformat(),
             'analysis_results': analysis_results,
-            'report_id': f"POSITION_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'report_id': f"POSITION_{format_now()}",
             # 'caseNumber': case_details.get('caseNumber') if case_details else 1212,
         }
         
@@ -198,6 +203,138 @@ def analyze_position_falsification():
         return jsonify({'error': str(e)}), 500
 
 
+def _analysis_cache_key(analysis, file_hash, triage=False):
+    """Cache key of an analysis of some file contents. Sybil triage results
+    are capped, so they are kept apart from full ones"""
+    if triage and analysis == 'sybil':
+        return f"analysis:sybil:triage:{file_hash}"
+    return f"analysis:{analysis}:{file_hash}"
+
+
+def _cached_analysis(cache_key, filepath):
+    """Cached results for identical file contents, or None. The cached file
+    name and analysis time belong to whichever upload was analyzed first,
+    so they are replaced with this upload's"""
+    results = cache.get(cache_key)
+    if results is None:
+        return None
+
+    results = dict(results)
+    now = datetime.now().isoformat()
+    if 'file' in results:  # Sybil
+        results.update(file=filepath, timestamp=now)
+    if 'file_analyzed' in results:  # Position Falsification
+        results.update(file_analyzed=os.path.basename(filepath), analysis_timestamp=now)
+    return results
+
+
+def run_sybil(filepath, triage=False):
+    """Run Sybil analysis (module-level so it can be sent to a worker process)"""
+    from forensics.sybil_attack import SybilAttackDetector, CRITICAL_FINDINGS
+    return SybilAttackDetector().analyze(filepath, CRITICAL_FINDINGS if triage else None)
+
+
+def run_position(filepath, triage=False):
+    """Run Position Falsification analysis (module-level so it can be sent to a
+    worker process). Its checks have no triage mode, so triage is ignored"""
+    from forensics.position_falsification import PositionFalsificationDetector
+    return PositionFalsificationDetector().analyze(filepath)
+
+
+def _analysis_pool(broken=None):
+    """The shared analysis process pool, created on first use. Passing the
+    pool that raised BrokenProcessPool replaces it with a fresh one."""
+    global analysis_executor
+    with analysis_executor_lock:
+        if analysis_executor is None or analysis_executor is broken:
+            if broken is not None:
+                broken.shutdown(cancel_futures=True)
+            # Workers come from a forkserver rather than being forked from
+            # this multi-threaded web worker
+            analysis_executor = ProcessPoolExecutor(
+                max_workers=2, mp_context=multiprocessing.get_context('forkserver')
+            )
+        return analysis_executor
+
+
+def _run_analyses(calls):
+    """Run {key: (runner, *args)} in the analysis pool and return
+    {key: result}. If a worker dies, the pool is replaced and the calls
+    are retried once."""
+    executor = _analysis_pool()
+    try:
+        futures = {key: executor.submit(*call) for key, call in calls.items()}
+        return {key: future.result() for key, future in futures.items()}
+    except BrokenProcessPool:
+        executor = _analysis_pool(broken=executor)
+        futures = {key: executor.submit(*call) for key, call in calls.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+
+@app.route('/api/analyze/all', methods=['POST'])
+def analyze_all():
+    """Analyze file for both Sybil attack and Position Falsification in parallel"""
+    try:
+        data = request.get_json()
+        filename = data.get('filename')
+
+        if not filename:
+            return jsonify({'error': 'No filename provided'}), 400
+
+        filepath = os.path.join(UPLOAD_DIR, filename)
+
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+
+        # Recalculate backend-authoritative file hash and size
+        file_hash = file_handler.hash_file(filepath)
+        file_size = os.path.getsize(filepath)
+
+        # Case details may be sent in JSON
+        case_details = data.get('case_details') or data.get('case') or None
+
+        # A triage run stops each check once the threat level is settled
+        triage = bool(data.get('triage'))
+
+        # (key, attack type, report id prefix, runner) per analysis
+        analyses = [
+            ('sybil', 'Sybil Attack', 'SYBIL', run_sybil),
+            ('position', 'Position Falsification', 'POSITION', run_position),
+        ]
+
+        # Serve cached results, fan the rest out to separate processes
+        results = {}
+        calls = {}
+        for key, _, _, runner in analyses:
+            results[key] = _cached_analysis(_analysis_cache_key(key, file_hash, triage), filepath)
+            if results[key] is None:
+                calls[key] = (runner, filepath, triage)
+
+        for key, result in _run_analyses(calls).items():
+            results[key] = result
+            if not result.get('error'):
+                cache.set(_analysis_cache_key(key, file_hash, triage), result)
+
+        # Generate report data
+        reports = {}
+        for key, attack_type, prefix, _ in analyses:
+            reports[key] = {
+                'attack_type': attack_type,
+                'filename': data.get('original_filename', filename),
+                'timestamp': datetime.now().isoformat(),
+                'analysis_results': results[key],
+                'report_id': f"{prefix}_{format_now()}",
+            }
+
+        return jsonify({
+            'success': True,
+            'reports': reports, 'file_hash': file_hash, 'file_size': file_size, 'case_details': case_details
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/download/pdf/<report_type>', methods=['POST'])
 def download_pdf_report(report_type):
     """Generate and download PDF report"""
@@ -211,33 +348,106 @@ def download_pdf_report(report_type):
         # Generate PDF
         pdf_path = pdf_generator.generate_report(report_data, report_type)
         
-        return send_file(
-            pdf_path,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"Autoforensics_{report_type}_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        )
+        return _send_pdf(pdf_path, report_type)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/download/pdf/<report_type>/jobs', methods=['POST'])
+def submit_pdf_job(report_type):
+    """Queue PDF report generation in the background and return a job id"""
+    try:
+        data = request.get_json()
+        report_data = data.get('report')
+
+        if not report_data:
+            return jsonify({'error': 'No report data provided'}), 400
+
+        job_id = uuid.uuid4().hex
+        _set_pdf_job(job_id, {'status': 'pending', 'report_type': report_type})
+        pdf_executor.submit(_run_pdf_job, job_id, report_data, report_type)
+
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'pending'}), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/download/pdf/status/<job_id>', methods=['GET'])
+def pdf_job_status(job_id):
+    """Report whether a queued PDF job has finished"""
+    job = cache.get(f"pdf_job:{job_id}")
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == 'failed':
+        return jsonify({'job_id': job_id, 'status': 'failed', 'error': job['error']}), 200
+    return jsonify({'job_id': job_id, 'status': job['status']}), 200
+
+
+@app.route('/api/download/pdf/result/<job_id>', methods=['GET'])
+def pdf_job_result(job_id):
+    """Download the PDF produced by a finished job"""
+    try:
+        job = cache.get(f"pdf_job:{job_id}")
+        if job is None or (job['status'] == 'finished' and not os.path.exists(job['path'])):
+            return jsonify({'error': 'Job not found'}), 404
+
+        if job['status'] == 'pending':
+            return jsonify({'error': 'Report is not ready yet'}), 409
+
+        cache.delete(f"pdf_job:{job_id}")
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error']}), 500
+        return _send_pdf(job['path'], job['report_type'])
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _set_pdf_job(job_id, job):
+    """Record a PDF job's state; jobs nobody collects expire after PDF_JOB_TIMEOUT"""
+    cache.set(f"pdf_job:{job_id}", job, timeout=app.config['PDF_JOB_TIMEOUT'])
+
+
+def _run_pdf_job(job_id, report_data, report_type):
+    """Render a queued report and record the outcome"""
+    try:
+        pdf_path = pdf_generator.generate_report(report_data, report_type)
+    except Exception as e:
+        _set_pdf_job(job_id, {'status': 'failed', 'report_type': report_type, 'error': str(e)})
+    else:
+        _set_pdf_job(job_id, {'status': 'finished', 'report_type': report_type, 'path': pdf_path})
+
+
+def _send_pdf(pdf_path, report_type):
+    """Send a generated PDF report as a download"""
+    download_name = f"Autoforensics_{report_type}_Report_{format_now()}.pdf"
+
+    # Behind nginx, hand the file off via an internal location instead of
+    # streaming it through the Python worker
+    accel_prefix = app.config['X_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        response = app.response_class(mimetype='application/pdf')
+        response.headers['X-Accel-Redirect'] = accel_prefix + os.path.basename(pdf_path)
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
+
+    return send_file(
+        pdf_path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True
+    )
+
+
 @app.route('/api/cleanup/<filename>', methods=['DELETE'])
 def cleanup_file(filename):
     """Clean up uploaded file after analysis"""
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
-        # Recalculate backend-authoritative file hash and size
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as fh:
-            for chunk in iter(lambda: fh.read(8192), b''):
-                sha256.update(chunk)
-        file_hash = sha256.hexdigest()
-        file_size = os.path.getsize(filepath)
-
-        # Case details may be sent in JSON
-        case_details = data.get('case_details') or data.get('case') or None
+        filepath = os.path.join(UPLOAD_DIR, filename)
         
         if os.path.exists(filepath):
             os.remove(filepath)
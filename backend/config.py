@@ -11,11 +11,27 @@ class Config:
     # File upload settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
-    ALLOWED_EXTENSIONS = {'csv', 'json', 'txt', 'log', 'pcap'}
+    ALLOWED_EXTENSIONS = frozenset({'csv', 'json', 'txt', 'log', 'pcap'})
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB chunks when streaming uploads to disk
     
     # Report settings
     REPORT_FOLDER = os.path.join(os.path.dirname(__file__), 'reports')
     
+    # Let the front-end server send report files instead of the Python worker.
+    # USE_X_SENDFILE emits X-Sendfile (Apache/lighttpd); X_ACCEL_REDIRECT_PREFIX
+    # is the nginx internal location mapped to REPORT_FOLDER, e.g. '/protected/'
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False') == 'True'
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')
+
+    # Background threads per worker for queued PDF generation
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+    PDF_JOB_TIMEOUT = 3600  # queued PDF jobs are forgotten after an hour
+
+    # Analysis result cache, keyed by file content hash
+    CACHE_TYPE = 'FileSystemCache'
+    CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
+    CACHE_DEFAULT_TIMEOUT = 24 * 3600  # 24 hours
+
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
@@ -3,9 +3,26 @@
 Forensics module for attack detection
 """
 
-from .sybil_attack import SybilAttackDetector
-from .position_falsification import PositionFalsificationDetector
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .sybil_attack import SybilAttackDetector
+    from .position_falsification import PositionFalsificationDetector
 
 __all__ = ['SybilAttackDetector', 'PositionFalsificationDetector']
 
+# Detectors are imported on first access so that importing one submodule
+# doesn't pull in the other's NumPy/pandas/Numba dependencies
+_EXPORTS = {
+    'SybilAttackDetector': '.sybil_attack',
+    'PositionFalsificationDetector': '.position_falsification',
+}
+
 
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
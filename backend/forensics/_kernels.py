@@ -0,0 +1,101 @@
+"""
+Numeric helpers shared by the detectors. The Sybil match kernel is
+JIT-compiled with Numba when it is installed, plain NumPy otherwise
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # optional JIT; the NumPy kernels are used instead
+    njit = None
+
+
+def round_cells(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Integer cells of 10**-decimals, matching round(value, decimals) * 10**decimals"""
+    scale = 10.0 ** decimals
+    scaled = values * scale
+    cells = np.round(scaled)
+    # Values ending in 5 just past the last kept decimal sit on a tie after
+    # scaling; round() settles those by the exact binary value, so defer to
+    # it for the few near-ties
+    for i in np.flatnonzero(np.abs(np.abs(scaled - cells) - 0.5) < 1e-6).tolist():
+        cells[i] = round(round(float(values[i]), decimals) * scale)
+    return cells.astype(np.int64)
+
+
+# Bytes of gathered samples per batch of pairs in the NumPy fallback
+_PAIR_BATCH_BYTES = 32 * 1024 * 1024
+
+
+def _count_matches_numpy(values, starts, lengths, first, second, tolerance, enough):
+    """For each track pair (first[k], second[k]), the number of samples over
+    the shorter track at which every column differs by less than its
+    tolerance. Track t is values[starts[t]:starts[t] + lengths[t]], one row
+    per sample, and missing values are NaN, which never match.
+
+    Only whether a count reaches `enough` is meaningful: pairs too short to
+    get there are skipped, and the JIT version stops counting early.
+    """
+    counts = np.zeros(len(first), dtype=np.int64)
+    overlap = np.minimum(lengths[first], lengths[second])
+    todo = np.flatnonzero(overlap >= enough)
+    if len(todo) == 0:
+        return counts
+
+    def count_batch(batch):
+        n = overlap[batch]
+        # Pair of each compared sample and the sample's index in its tracks
+        pair = np.repeat(np.arange(len(batch)), n)
+        sample = np.arange(len(pair)) - np.repeat(np.cumsum(n) - n, n)
+        diff = np.abs(values[starts[first[batch]][pair] + sample]
+                      - values[starts[second[batch]][pair] + sample])
+        matched = (diff < tolerance).all(axis=1)
+        counts[batch] = np.bincount(pair, weights=matched, minlength=len(batch)).astype(np.int64)
+
+    # Batches of pairs are compared in threads; NumPy releases the GIL on
+    # the large gathers and comparisons, so they run in parallel
+    per_batch = max(1, _PAIR_BATCH_BYTES // max(1, values[:1].nbytes * 2))
+    ends = np.cumsum(overlap[todo])
+    cuts = np.unique(np.searchsorted(ends, np.arange(per_batch, ends[-1], per_batch), side='right'))
+    batches = [batch for batch in np.split(todo, cuts) if len(batch)]
+    if len(batches) == 1:
+        count_batch(batches[0])
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(batches), os.cpu_count() or 1)) as pool:
+            list(pool.map(count_batch, batches))
+    return counts
+
+
+if njit is not None:
+    # No fastmath: it assumes NaN-free input, and missing samples are NaN.
+    # Samples are compared as float64, not quantized to int16 cells: the
+    # rounding would move pairs across the tolerance boundaries, and
+    # projected x/y in metres overflow int16 at decimetre resolution
+    @njit('i8[:](f8[:, :], i8[:], i8[:], i8[:], i8[:], f8[:], i8)', parallel=True, cache=True)
+    def count_matches(values, starts, lengths, first, second, tolerance, enough):
+        """Pair-parallel version of _count_matches_numpy. A pair stops as
+        soon as it reaches `enough` matches or can no longer reach it."""
+        counts = np.zeros(len(first), dtype=np.int64)
+        for k in prange(len(first)):
+            a = starts[first[k]]
+            b = starts[second[k]]
+            n = min(lengths[first[k]], lengths[second[k]])
+            count = 0
+            for s in range(n):
+                if count >= enough or count + n - s < enough:
+                    break
+                match = True
+                for c in range(values.shape[1]):
+                    if not abs(values[a + s, c] - values[b + s, c]) < tolerance[c]:
+                        match = False
+                        break
+                if match:
+                    count += 1
+            counts[k] = count
+        return counts
+else:
+    count_matches = _count_matches_numpy
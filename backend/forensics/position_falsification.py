@@ -1,8 +1,184 @@
-import json
-import csv
+import logging
+import os
+from array import array
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
-import math
+from typing import Dict, Final, List, Any
+
+import numpy as np
+import pandas as pd
+
+from ._kernels import round_cells
+from .readers import read_csv, read_trace
+
+try:
+    from numba import njit, prange
+except ImportError:  # optional JIT; the NumPy kernel is used instead
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+
+# Numeric precision of the normalized columns. float32 would halve memory
+# traffic but only resolves ~1m of latitude (the repeated-position check
+# works at 10cm), shifts speed ratios that sit on the threshold, and epoch
+# timestamps don't fit int32 milliseconds, so fixes stay float64.
+_FIX_DTYPE = np.float64
+
+# Accepted column names (matched case-insensitively) for each normalized
+# field, in priority order
+_FIELD_ALIASES = {
+    'psn': ('psn', 'vehicle_id', 'id', 'vehicleid'),
+    'localtime': ('localtime', 'timestamp', 'time'),
+    'x': ('x', 'lon', 'longitude', 'lng'),
+    'y': ('y', 'lat', 'latitude'),
+    'spd': ('spd', 'speed', 'velocity'),
+}
+
+# Lowercase column name -> (field, priority), built once
+_ALIAS_TABLE = {
+    alias: (field, rank)
+    for field, aliases in _FIELD_ALIASES.items() for rank, alias in enumerate(aliases)
+}
+
+
+def _resolve_columns(columns) -> Dict[str, List[str]]:
+    """Map each normalized field to the matching column names, best first"""
+    matches = {field: [] for field in _FIELD_ALIASES}
+    for column in columns:
+        match = _ALIAS_TABLE.get(str(column).lower())
+        if match is not None:
+            field, rank = match
+            matches[field].append((rank, column))
+    return {
+        field: [column for _, column in sorted(found, key=lambda m: m[0])]
+        for field, found in matches.items()
+    }
+
+
+EARTH_RADIUS_M: Final[float] = 6371000.0  # Earth radius in meters
+
+# Thresholds (tunable based on vehicular network specs). Module-level so the
+# JIT kernel folds them in as constants
+SPEED_THRESHOLD_MPS: Final[float] = 50.0  # 50 m/s ~ 180 km/h (realistic highway max)
+EXTREME_SPEED_MPS: Final[float] = 100.0   # 100 m/s ~ 360 km/h (impossible for regular vehicles)
+MIN_TIME_DELTA: Final[float] = 0.1  # seconds
+SPEED_INCONSISTENCY_RATIO: Final[float] = 2.0  # Reported vs computed speed ratio threshold
+
+# Rows parsed per CSV chunk; bounds the parser's working set on large traces
+CSV_CHUNK_ROWS: Final[int] = 1 << 20
+
+
+def _equirectangular(phi1, lam1, phi2, lam2):
+    """Vectorized distance in meters between coordinate arrays (radians).
+
+    Equirectangular projection at the mid-latitude of each step: one cosine
+    per step instead of Haversine's four trig calls. On the same sphere it
+    agrees with Haversine to ~1e-11 relative for 10m steps and ~1e-5 for
+    10km jumps, far inside the speed thresholds' tolerance.
+    """
+    dx = (lam2 - lam1) * np.cos((phi1 + phi2) * 0.5)
+    dy = phi2 - phi1
+    return EARTH_RADIUS_M * np.hypot(dx, dy)
+
+
+# Anomaly type names, indexed by the type code stored with each anomaly
+ANOMALY_TYPES = (
+    'teleportation',
+    'impossible_speed',
+    'inconsistent_speed',
+    'non_increasing_timestamp',
+    'repeated_position',
+)
+ANOMALY_TELEPORT, ANOMALY_IMPOSSIBLE, ANOMALY_INCONSISTENT, ANOMALY_TIMESTAMP, ANOMALY_REPEATED = range(5)
+
+# Recommendations for High/Critical findings, and for every report
+_URGENT_RECOMMENDATIONS = (
+    "URGENT: Immediately flag and isolate vehicles with falsified positions",
+    "Notify traffic management systems of compromised data",
+    "Implement emergency position verification protocols",
+    "Conduct forensic analysis of affected vehicle communication logs",
+    "Review and strengthen vehicle authentication mechanisms",
+)
+_BASELINE_RECOMMENDATIONS = (
+    "Cross-reference position data with neighboring vehicles",
+    "Monitor for physically impossible movements and speeds",
+    "Implement real-time speed and acceleration sanity checks",
+    "Use cryptographic signatures for all position messages",
+    "Deploy position plausibility checking algorithms",
+    "Establish baseline movement patterns for anomaly detection",
+)
+
+# Per-step anomaly flags produced by the scan kernels
+STEP_TIMESTAMP = 1
+STEP_TELEPORT = 2
+STEP_IMPOSSIBLE = 4
+STEP_INCONSISTENT = 8
+STEP_REPEATED = 16
+
+
+def _scan_steps_numpy(phi, lam, t, spd):
+    """Distances, clamped time deltas, computed speeds and anomaly flags for
+    every consecutive pair of fixes; each step is attributed to its arrival fix"""
+    raw_dt = np.diff(t)
+    dt = np.maximum(raw_dt, MIN_TIME_DELTA)
+    # Every step needs its distance: even when dt alone rules out a speed
+    # violation, the repeated-position (d < 10cm) and reported-speed ratio
+    # checks still depend on d, so there is no dt-only shortcut
+    d = _equirectangular(phi[:-1], lam[:-1], phi[1:], lam[1:])
+    speed = d / dt
+
+    # A missing reported speed is NaN and never passes the comparisons
+    rep = spd[1:]
+    lo = np.minimum(rep, speed)
+    comparable = lo > 0.1
+    ratio = np.maximum(rep, speed) / np.maximum(lo, 1e-9)
+    teleport = speed > EXTREME_SPEED_MPS
+
+    flags = np.zeros(len(d), dtype=np.uint8)
+    flags[raw_dt <= 0] |= STEP_TIMESTAMP
+    flags[teleport] |= STEP_TELEPORT
+    flags[~teleport & (speed > SPEED_THRESHOLD_MPS)] |= STEP_IMPOSSIBLE
+    flags[comparable & (ratio > SPEED_INCONSISTENCY_RATIO)] |= STEP_INCONSISTENT
+    flags[d < 0.1] |= STEP_REPEATED  # Less than 10cm movement
+    return d, dt, speed, flags
+
+
+if njit is not None:
+    # No fastmath: it assumes NaN-free input, and missing speeds are NaN
+    @njit('Tuple((f8[:], f8[:], f8[:], u1[:]))(f8[:], f8[:], f8[:], f8[:])',
+          parallel=True, cache=True)
+    def _scan_steps(phi, lam, t, spd):
+        """Fused single-pass version of _scan_steps_numpy (no temporaries)"""
+        n = max(len(phi) - 1, 0)
+        d = np.empty(n)
+        dt = np.empty(n)
+        speed = np.empty(n)
+        flags = np.zeros(n, dtype=np.uint8)
+        for i in prange(n):
+            dx = (lam[i + 1] - lam[i]) * np.cos((phi[i] + phi[i + 1]) * 0.5)
+            dy = phi[i + 1] - phi[i]
+            d[i] = EARTH_RADIUS_M * np.sqrt(dx * dx + dy * dy)
+            raw_dt = t[i + 1] - t[i]
+            dt[i] = max(raw_dt, MIN_TIME_DELTA)
+            speed[i] = d[i] / dt[i]
+
+            flag = 0
+            if raw_dt <= 0:
+                flag |= STEP_TIMESTAMP
+            if speed[i] > EXTREME_SPEED_MPS:
+                flag |= STEP_TELEPORT
+            elif speed[i] > SPEED_THRESHOLD_MPS:
+                flag |= STEP_IMPOSSIBLE
+            rep = spd[i + 1]
+            if rep > 0.1 and speed[i] > 0.1:
+                if max(rep, speed[i]) / min(rep, speed[i]) > SPEED_INCONSISTENCY_RATIO:
+                    flag |= STEP_INCONSISTENT
+            if d[i] < 0.1:
+                flag |= STEP_REPEATED
+            flags[i] = flag
+        return d, dt, speed, flags
+else:
+    _scan_steps = _scan_steps_numpy
 
 
 class PositionFalsificationDetector:
@@ -16,182 +192,100 @@ class PositionFalsificationDetector:
         self.threat_level = "Unknown"
         self.confidence_score = 0.0
         
-    def analyze(self, filepath: str) -> Dict[str, Any]:
+    def analyze(self, filepath: str, narrative: bool = True) -> Dict[str, Any]:
         """Analyze the provided CSV for position falsification attacks.
-        Returns a report dictionary with findings."""
+        Returns a report dictionary with findings.
+
+        Batch callers that only aggregate threat levels can pass
+        narrative=False to skip building the summary and recommendations."""
 
         try:
-            data = self._read_file(filepath)
-            data = self._normalize_data(data)
-
-            # Group by PSN to analyze per-vehicle traces
-            vehicles = {}
-            for row in data:
-                psn = row.get('psn')
-                if psn is None:
-                    continue
-                vehicles.setdefault(psn, []).append(row)
-
-            anomalies = []
-            total_points = 0
-            impossible_moves = 0
-            inconsistent_speeds = 0
-            teleportations = 0
+            data = read_trace(filepath, csv_reader=self._read_csv)
+            columns = self._normalize_data(data)
+
+            # Fixes outside the valid lat/lon range can't be placed on the globe:
+            # count them and keep them out of the distance sweep. They are
+            # reported but not rated, since receivers routinely send the
+            # J2735 "unavailable" values (e.g. latitude 90.0000001)
+            invalid = self._validate_coordinates(columns['y'], columns['x'])
+            invalid_coordinates = int(invalid.sum())
+            if invalid_coordinates:
+                columns = {field: values[~invalid] for field, values in columns.items()}
+
+            # Integer vehicle codes in order of first appearance. One stable
+            # sort by (vehicle, time) lays each vehicle's trace out contiguously
+            # in time order, and the places where the code changes mark the
+            # per-vehicle segments
+            psn_codes, psn_values = pd.factorize(columns['psn'])
+            order = np.lexsort((columns['localtime'], psn_codes))
+            psn_codes = psn_codes[order]
+            localtime, lat_col, lon_col, spd_col = (
+                columns['localtime'][order], columns['y'][order], columns['x'][order], columns['spd'][order]
+            )
+            boundaries = np.flatnonzero(np.diff(psn_codes)) + 1
+            starts = np.r_[0, boundaries]
+            ends = np.r_[boundaries, len(order)]
+
+            # Convert to radians once per fix rather than once per step
+            phi_col, lam_col = np.radians(lat_col), np.radians(lon_col)
+
+            # Anomalies are kept column-wise (one typed array per field) and
+            # only turned into dicts for the sample that goes into the report
+            anomalies = {
+                'type': array('B'),
+                'psn': array('q'),
+                't': array('d'),
+                'speed': array('d'),
+                'lat': array('d'),
+                'lon': array('d'),
+            }
             off_road_positions = 0
-            repeated_positions = 0
-            timestamp_anomalies = 0
-            
-            affected_vehicles = set()
-            geographic_hotspots = {}  # (lat, lon) -> count
-
-            # Thresholds (tunable based on vehicular network specs)
-            SPEED_THRESHOLD_MPS = 50.0  # 50 m/s ~ 180 km/h (realistic highway max)
-            EXTREME_SPEED_MPS = 100.0   # 100 m/s ~ 360 km/h (impossible for regular vehicles)
-            MIN_TIME_DELTA = 0.1  # seconds
-            SPEED_INCONSISTENCY_RATIO = 2.0  # Reported vs computed speed ratio threshold
-
-            # Helper: compute euclidean distance (approximate for small distances)
-            def dist(coord1, coord2):
-                try:
-                    lat1, lon1 = float(coord1[0]), float(coord1[1])
-                    lat2, lon2 = float(coord2[0]), float(coord2[1])
-                    
-                    # Haversine formula for more accurate distance
-                    R = 6371000  # Earth radius in meters
-                    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-                    dphi = math.radians(lat2 - lat1)
-                    dlambda = math.radians(lon2 - lon1)
-                    
-                    a = math.sin(dphi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda/2)**2
-                    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                    
-                    return R * c  # Distance in meters
-                except Exception as e:
-                    print(f"Distance calculation error: {e}")
-                    return None
-
-            for psn, rows in vehicles.items():
-                # Sort by timestamp
-                rows_sorted = sorted(rows, key=lambda r: float(r.get('localtime', 0)))
-                
-                if len(rows_sorted) < 2:
-                    continue
-                    
-                prev = None
-                for r in rows_sorted:
-                    total_points += 1
-                    
-                    if prev is not None:
-                        t1 = float(prev.get('localtime', 0))
-                        t2 = float(r.get('localtime', 0))
-                        dt = t2 - t1
-                        
-                        # Check timestamp anomalies
-                        if dt <= 0:
-                            timestamp_anomalies += 1
-                            anomalies.append({
-                                'psn': psn,
-                                'type': 'non_increasing_timestamp',
-                                't1': t1,
-                                't2': t2
-                            })
-                            affected_vehicles.add(str(psn))
-                            
-                        if dt < MIN_TIME_DELTA:
-                            dt = MIN_TIME_DELTA
-                        
-                        # Get coordinates
-                        x1, y1 = prev.get('x'), prev.get('y')
-                        x2, y2 = r.get('x'), r.get('y')
-                        
-                        if None in [x1, y1, x2, y2]:
-                            prev = r
-                            continue
-                        
-                        # Calculate distance
-                        d = dist((y1, x1), (y2, x2))  # Note: (lat, lon) format
-                        
-                        if d is None:
-                            prev = r
-                            continue
-                        
-                        # Calculate computed speed
-                        computed_speed = d / dt  # meters per second
-                        
-                        # Get reported speed
-                        reported_speed = r.get('spd')
-                        
-                        # Check for speed inconsistencies
-                        if reported_speed is not None:
-                            try:
-                                rep_spd = float(reported_speed)
-                                
-                                # Check if reported speed differs significantly from computed
-                                if rep_spd > 0.1 and computed_speed > 0.1:
-                                    ratio = max(rep_spd, computed_speed) / min(rep_spd, computed_speed)
-                                    
-                                    if ratio > SPEED_INCONSISTENCY_RATIO:
-                                        inconsistent_speeds += 1
-                                        anomalies.append({
-                                            'psn': psn,
-                                            'type': 'inconsistent_speed',
-                                            'computed_speed': round(computed_speed, 2),
-                                            'reported_speed': round(rep_spd, 2),
-                                            'ratio': round(ratio, 2),
-                                            't': t2,
-                                            'location': (y2, x2)
-                                        })
-                                        affected_vehicles.add(str(psn))
-                            except Exception:
-                                pass
-                        
-                        # Check for teleportation (extreme speed)
-                        if computed_speed > EXTREME_SPEED_MPS:
-                            teleportations += 1
-                            anomalies.append({
-                                'psn': psn,
-                                'type': 'teleportation',
-                                'computed_speed': round(computed_speed, 2),
-                                'distance': round(d, 2),
-                                'time_delta': round(dt, 3),
-                                't': t2,
-                                'location': (y2, x2)
-                            })
-                            affected_vehicles.add(str(psn))
-                            
-                            # Add to geographic hotspots
-                            loc_key = (round(y2, 4), round(x2, 4))
-                            geographic_hotspots[loc_key] = geographic_hotspots.get(loc_key, 0) + 1
-                        
-                        # Check for impossible but not extreme speeds
-                        elif computed_speed > SPEED_THRESHOLD_MPS:
-                            impossible_moves += 1
-                            anomalies.append({
-                                'psn': psn,
-                                'type': 'impossible_speed',
-                                'computed_speed': round(computed_speed, 2),
-                                'distance': round(d, 2),
-                                'time_delta': round(dt, 3),
-                                't': t2,
-                                'location': (y2, x2)
-                            })
-                            affected_vehicles.add(str(psn))
-                            
-                            loc_key = (round(y2, 4), round(x2, 4))
-                            geographic_hotspots[loc_key] = geographic_hotspots.get(loc_key, 0) + 1
-                        
-                        # Check for repeated identical positions (GPS lock/spoofing)
-                        if d < 0.1:  # Less than 10cm movement
-                            repeated_positions += 1
-                            if repeated_positions % 10 == 0:  # Log every 10th to avoid spam
-                                anomalies.append({
-                                    'psn': psn,
-                                    'type': 'repeated_position',
-                                    't': t2,
-                                    'location': (y2, x2)
-                                })
-                    
-                    prev = r
+
+            # Only vehicles with at least two fixes contribute steps
+            trace_lengths = ends - starts
+            total_points = int(trace_lengths[trace_lengths >= 2].sum())
+
+            # Distances, computed speeds (m/s) and anomaly flags for every
+            # consecutive pair of fixes in one pass over the whole sorted
+            # trace; the JIT kernel spreads the steps over all cores. Steps
+            # that cross from one vehicle to the next aren't movements
+            d, dt, computed, flags = _scan_steps(phi_col, lam_col, localtime, spd_col)
+            flags[boundaries - 1] = 0
+            step_psn = psn_codes[1:]  # each step belongs to its arrival fix's vehicle
+
+            # Check timestamp anomalies
+            ts_steps = np.flatnonzero(flags & STEP_TIMESTAMP)
+            timestamp_anomalies = len(ts_steps)
+            self._record_anomalies(anomalies, ANOMALY_TIMESTAMP, step_psn, localtime, computed,
+                                   lat_col, lon_col, ts_steps)
+
+            # Check for teleportation (extreme speed) and impossible but not
+            # extreme speeds; both feed the geographic hotspots
+            speed_steps = np.flatnonzero(flags & (STEP_TELEPORT | STEP_IMPOSSIBLE))
+            is_teleport = (flags[speed_steps] & STEP_TELEPORT) != 0
+            teleportations = int(is_teleport.sum())
+            impossible_moves = len(speed_steps) - teleportations
+            hotspot_fixes = np.zeros(len(order), dtype=bool)  # arrival fixes of speed anomalies
+            hotspot_fixes[speed_steps + 1] = True
+            self._record_anomalies(anomalies, np.where(is_teleport, ANOMALY_TELEPORT, ANOMALY_IMPOSSIBLE),
+                                   step_psn, localtime, computed, lat_col, lon_col, speed_steps)
+
+            # Reported speeds that differ significantly from computed ones
+            inconsistent_steps = np.flatnonzero(flags & STEP_INCONSISTENT)
+            inconsistent_speeds = len(inconsistent_steps)
+            self._record_anomalies(anomalies, ANOMALY_INCONSISTENT, step_psn, localtime, computed,
+                                   lat_col, lon_col, inconsistent_steps)
+
+            affected = np.zeros(len(psn_values), dtype=bool)  # indexed by PSN code
+            reportable = STEP_TIMESTAMP | STEP_TELEPORT | STEP_IMPOSSIBLE | STEP_INCONSISTENT
+            affected[step_psn[(flags & reportable) != 0]] = True
+
+            # Check for repeated identical positions (GPS lock/spoofing). Only
+            # every 10th is logged, to avoid spam
+            repeated_steps = np.flatnonzero(flags & STEP_REPEATED)
+            repeated_positions = len(repeated_steps)
+            self._record_anomalies(anomalies, ANOMALY_REPEATED, step_psn, localtime, computed,
+                                   lat_col, lon_col, repeated_steps[9::10])
 
             # Calculate threat metrics
             total_anomalies = teleportations + impossible_moves + inconsistent_speeds + timestamp_anomalies
@@ -221,10 +315,7 @@ class PositionFalsificationDetector:
                     self.threat_level = 'Low'
 
             # Prepare geographic hotspots
-            hotspot_list = [
-                {'lat': lat, 'lon': lon, 'incident_count': count}
-                for (lat, lon), count in sorted(geographic_hotspots.items(), key=lambda x: x[1], reverse=True)[:10]
-            ]
+            hotspot_list = self._top_hotspots(lat_col[hotspot_fixes], lon_col[hotspot_fixes])
 
             # Generate threat indicators
             threat_indicators = []
@@ -238,13 +329,15 @@ class PositionFalsificationDetector:
                 threat_indicators.append(f'Timestamp anomalies: {timestamp_anomalies} non-increasing or invalid timestamps')
             if repeated_positions > 50:
                 threat_indicators.append(f'GPS lock issues: {repeated_positions} repeated identical positions')
+            if invalid_coordinates > 0:
+                threat_indicators.append(f'Invalid coordinates: {invalid_coordinates} positions outside valid latitude/longitude ranges')
             if not threat_indicators:
                 threat_indicators.append('No significant anomalies detected')
 
             # Store results
             self.results = {
                 'total_positions_analyzed': total_points,
-                'total_vehicles': len(vehicles),
+                'total_vehicles': len(psn_values),
                 'anomalous_positions': total_anomalies,
                 'teleportations': teleportations,
                 'impossible_movements': impossible_moves,
@@ -253,9 +346,11 @@ class PositionFalsificationDetector:
                 'timestamp_anomalies': timestamp_anomalies,
                 'repeated_positions': repeated_positions,
                 'off_road_positions': off_road_positions,
+                'invalid_coordinates': invalid_coordinates,
                 'gps_spoofing_indicators': teleportations,
-                'affected_vehicles': list(affected_vehicles)[:50],  # Limit to 50 for report
+                'affected_vehicles': [str(psn) for psn in psn_values[affected][:50]],  # Limit to 50 for report
                 'geographic_hotspots': hotspot_list,
+                'sample_anomalies': self._anomaly_records(anomalies, psn_values),
                 'threat_indicators': threat_indicators,
                 'anomaly_rate': round(anomaly_rate * 100, 2) if total_points > 0 else 0,
                 'detection_metrics': {
@@ -266,106 +361,183 @@ class PositionFalsificationDetector:
                 }
             }
 
-            return self._compile_report(filepath)
+            return self._compile_report(filepath, narrative)
 
         except Exception as e:
-            import traceback
-            print(f"Analysis error: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Position analysis failed for %s", filepath)
             return {
                 'error': True,
                 'message': str(e),
                 'timestamp': datetime.now().isoformat()
             }
 
-    def _read_file(self, filepath: str) -> Any:
-        """Read and parse the input file"""
-        file_extension = filepath.split('.')[-1].lower()
-
-        if file_extension == 'json':
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        elif file_extension == 'csv':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                return list(reader)
-        elif file_extension in ['txt', 'log']:
-            with open(filepath, 'r') as f:
-                return f.readlines()
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
+    @staticmethod
+    def _top_hotspots(lat: np.ndarray, lon: np.ndarray, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most frequent locations on a 1e-4 degree (~11m) grid.
 
-    def _normalize_data(self, data: List[Dict]) -> List[Dict]:
-        """Normalize field names to standard format"""
-        normalized = []
-        
-        for row in data:
-            # Create normalized row with standard field names
-            norm_row = {}
-            
-            # PSN (vehicle ID) - case insensitive
-            for key in ['PSN', 'psn', 'vehicle_id', 'id', 'VehicleID']:
-                if key in row and row[key]:
-                    norm_row['psn'] = row[key]
-                    break
-            
-            # Timestamp
-            for key in ['localtime', 'LocalTime', 'timestamp', 'time', 'Time']:
-                if key in row and row[key]:
-                    try:
-                        norm_row['localtime'] = float(row[key])
-                        break
-                    except:
-                        pass
-            
-            # X coordinate (longitude)
-            for key in ['x', 'X', 'lon', 'longitude', 'Longitude', 'lng']:
-                if key in row and row[key]:
-                    try:
-                        norm_row['x'] = float(row[key])
-                        break
-                    except:
-                        pass
-            
-            # Y coordinate (latitude)
-            for key in ['y', 'Y', 'lat', 'latitude', 'Latitude']:
-                if key in row and row[key]:
-                    try:
-                        norm_row['y'] = float(row[key])
-                        break
-                    except:
-                        pass
-            
-            # Speed
-            for key in ['spd', 'Spd', 'speed', 'Speed', 'velocity']:
-                if key in row and row[key]:
-                    try:
-                        norm_row['spd'] = float(row[key])
-                        break
-                    except:
-                        pass
-            
-            # Only add rows with minimum required fields
-            if 'psn' in norm_row and 'localtime' in norm_row and 'x' in norm_row and 'y' in norm_row:
-                normalized.append(norm_row)
-        
-        return normalized
+        Each location is quantized to integer grid cells packed into a single
+        int64 key, so counting is one np.unique instead of a dict of float
+        tuples. Ties keep the order in which locations were first seen.
+        """
+        lat_cells = round_cells(lat, 4)
+        lon_cells = round_cells(lon, 4)
+        keys = (lat_cells + 900_000) * 3_600_001 + (lon_cells + 1_800_000)
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        top = np.lexsort((first, -counts))[:limit]
+        return [
+            {
+                'lat': int(lat_cells[first[k]]) / 1e4,
+                'lon': int(lon_cells[first[k]]) / 1e4,
+                'incident_count': int(counts[k])
+            }
+            for k in top.tolist()
+        ]
+
+    @staticmethod
+    def _record_anomalies(anomalies: Dict[str, array], anomaly_type: Any, step_psn: np.ndarray,
+                          t: np.ndarray, speed: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                          steps: np.ndarray):
+        """Append one anomaly per step in bulk, straight from the column buffers.
+        anomaly_type is a single type code or one code per step."""
+        arrivals = steps + 1
+        types = np.broadcast_to(np.asarray(anomaly_type, dtype=np.uint8), len(steps))
+        anomalies['type'].frombytes(types.tobytes())
+        anomalies['psn'].frombytes(step_psn[steps].astype(np.int64).tobytes())
+        anomalies['t'].frombytes(t[arrivals].tobytes())
+        anomalies['speed'].frombytes(speed[steps].tobytes())
+        anomalies['lat'].frombytes(lat[arrivals].tobytes())
+        anomalies['lon'].frombytes(lon[arrivals].tobytes())
+
+    @staticmethod
+    def _anomaly_records(anomalies: Dict[str, array], psn_values: np.ndarray,
+                         limit: int = 20) -> List[Dict[str, Any]]:
+        """Materialize the highest-speed anomalies as report dicts"""
+        speed = np.frombuffer(anomalies['speed'], dtype=np.float64)
+        top = np.argsort(-speed, kind='stable')[:limit]
+        return [
+            {
+                'psn': psn_values[anomalies['psn'][i]],
+                'type': ANOMALY_TYPES[anomalies['type'][i]],
+                't': anomalies['t'][i],
+                'computed_speed': round(anomalies['speed'][i], 2),
+                'location': (anomalies['lat'][i], anomalies['lon'][i])
+            }
+            for i in top.tolist()
+        ]
+
+    def _read_csv(self, filepath: str) -> pd.DataFrame:
+        """Read only the columns we normalize (BSM exports carry many more).
 
-    def _compile_report(self, filepath: str) -> Dict[str, Any]:
+        Vehicle IDs stay strings so values like "007" survive; everything
+        else is parsed straight to floats by the C parser.
+        """
+        try:
+            header = pd.read_csv(filepath, encoding='utf-8', nrows=0).columns
+        except pd.errors.EmptyDataError:
+            # A 0-byte upload has no header either: analyze it as no fixes
+            return pd.DataFrame(columns=list(_FIELD_ALIASES))
+        fields = _resolve_columns(header)
+        dtypes = {
+            column: (str if field == 'psn' else _FIX_DTYPE)
+            for field, found in fields.items() for column in found
+        }
+        try:
+            return self._read_csv_chunks(filepath, list(dtypes), dtypes)
+        except ValueError:
+            # A non-numeric cell in a numeric column: let pandas infer the
+            # types and leave the coercion to _normalize_data
+            return self._read_csv_chunks(filepath, list(dtypes), {column: str for column in fields['psn']})
+
+    def _read_csv_chunks(self, filepath: str, usecols: List[str], dtypes: Dict[str, Any]) -> pd.DataFrame:
+        """Parse the CSV CSV_CHUNK_ROWS rows at a time, normalizing each chunk
+        as it arrives so only the compact canonical columns of usable rows
+        are held for the whole file.
+
+        Every usable fix is still kept, since the sweep needs them all in one
+        (vehicle, time) sort: chunking bounds the parser's working set, not
+        the memory the trace itself takes."""
+        parts = []
+        with read_csv(filepath, usecols=usecols, dtype=dtypes, chunksize=CSV_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                parts.append(self._normalize_data(chunk))
+        if not parts:
+            return pd.DataFrame()
+
+        # One output array per column, filled chunk by chunk; each chunk is
+        # dropped once it has been copied in
+        total = sum(len(part['psn']) for part in parts)
+        columns = {field: np.empty(total, dtype=values.dtype) for field, values in parts[0].items()}
+        offset = 0
+        parts.reverse()
+        while parts:
+            part = parts.pop()
+            size = len(part['psn'])
+            for field, values in part.items():
+                columns[field][offset:offset + size] = values
+            offset += size
+        return pd.DataFrame(columns, copy=False)
+
+    def _normalize_data(self, data: Any) -> Dict[str, np.ndarray]:
+        """Normalize field names to standard format.
+
+        Returns parallel column arrays (psn, localtime, x, y, spd) rather than
+        a dict per row; a missing speed is stored as NaN. For each field the
+        first alias column holding a usable value wins, row by row.
+        """
+        frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        n = len(frame)
+        fields = _resolve_columns(frame.columns)
+
+        # PSN (vehicle ID): first non-empty alias
+        psn = pd.Series([None] * n, index=frame.index, dtype=object)
+        for key in fields['psn']:
+            values = frame[key].astype(object)
+            psn = psn.where(psn.notna(), values.where(values.notna() & values.astype(bool)))
+
+        # Numeric fields: first alias that parses as a number
+        numeric = {}
+        for field in ('localtime', 'x', 'y', 'spd'):
+            column = np.full(n, np.nan, dtype=_FIX_DTYPE)
+            for key in fields[field]:
+                values = pd.to_numeric(frame[key], errors='coerce').to_numpy(dtype=_FIX_DTYPE)
+                column = np.where(np.isnan(column), values, column)
+            numeric[field] = column
+
+        # Only keep rows with minimum required fields
+        keep = (psn.notna().to_numpy()
+                & ~np.isnan(numeric['localtime'])
+                & ~np.isnan(numeric['x'])
+                & ~np.isnan(numeric['y']))
+
+        return {
+            'psn': psn.to_numpy()[keep],
+            'localtime': numeric['localtime'][keep],
+            'x': numeric['x'][keep],
+            'y': numeric['y'][keep],
+            'spd': numeric['spd'][keep],
+        }
+
+    def _validate_coordinates(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Boolean mask of fixes whose latitude/longitude fall outside valid ranges"""
+        return (np.abs(lat) > 90) | (np.abs(lon) > 180)
+
+    def _compile_report(self, filepath: str, narrative: bool = True) -> Dict[str, Any]:
         """Compile final analysis report"""
 
         report = {
             'attack_type': 'Position Falsification',
             'analysis_timestamp': datetime.now().isoformat(),
-            'file_analyzed': filepath.split('/')[-1].split('\\')[-1],
+            'file_analyzed': os.path.basename(filepath),
             'threat_level': self.threat_level,
             'confidence_score': self.confidence_score,
             'status': 'completed',
-            'findings': self.results,
-            'summary': self._generate_summary(),
-            'recommendations': self._generate_recommendations()
+            'findings': self.results
         }
 
+        if narrative:
+            report['summary'] = self._generate_summary()
+            report['recommendations'] = self._generate_recommendations()
+
         return report
 
     def _generate_summary(self) -> str:
@@ -396,24 +568,6 @@ class PositionFalsificationDetector:
 
     def _generate_recommendations(self) -> List[str]:
         """Generate security recommendations based on findings"""
-        recommendations = []
-        
         if self.threat_level in ['High', 'Critical']:
-            recommendations.extend([
-                "URGENT: Immediately flag and isolate vehicles with falsified positions",
-                "Notify traffic management systems of compromised data",
-                "Implement emergency position verification protocols",
-                "Conduct forensic analysis of affected vehicle communication logs",
-                "Review and strengthen vehicle authentication mechanisms"
-            ])
-        
-        recommendations.extend([
-            "Cross-reference position data with neighboring vehicles",
-            "Monitor for physically impossible movements and speeds",
-            "Implement real-time speed and acceleration sanity checks",
-            "Use cryptographic signatures for all position messages",
-            "Deploy position plausibility checking algorithms",
-            "Establish baseline movement patterns for anomaly detection"
-        ])
-        
-        return recommendations
\ No newline at end of file
+            return list(_URGENT_RECOMMENDATIONS + _BASELINE_RECOMMENDATIONS)
+        return list(_BASELINE_RECOMMENDATIONS)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Trace file readers shared by the detectors
+"""
+
+import json
+import mmap
+import os
+from typing import Any, Callable, Dict, Iterator
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib parser
+    orjson = None
+
+
+def file_format(filepath: str) -> str:
+    """Lowercase extension of the file, without the dot"""
+    return os.path.splitext(filepath)[1][1:].lower()
+
+
+def read_json(filepath: str) -> Any:
+    """Parse a JSON document"""
+    if orjson is not None:
+        # Parse straight from the page cache without copying the file
+        # into a Python bytes object first
+        with open(filepath, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return orjson.loads(memoryview(mm))
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+
+def read_csv(filepath: str, **options) -> pd.DataFrame:
+    """Parse a CSV with pandas' C engine; malformed lines are skipped.
+
+    Keyword options are passed on to pd.read_csv (usecols, dtype, ...).
+    """
+    defaults = dict(engine='c', encoding='utf-8', memory_map=True, on_bad_lines='skip')
+    defaults.update(options)
+    return pd.read_csv(filepath, **defaults)
+
+
+def iter_log_records(filepath: str) -> Iterator[Dict]:
+    """Lazily parse a newline-delimited JSON log, one record per line.
+
+    Lines that are blank or not JSON objects are skipped, so only one
+    line is held in memory at a time while the records are consumed.
+    """
+    loads = orjson.loads if orjson is not None else json.loads
+
+    with open(filepath, 'rb', buffering=1024 * 1024) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def read_trace(filepath: str, csv_reader: Callable[[str], pd.DataFrame] = read_csv) -> Any:
+    """Read and parse a trace file by extension.
+
+    CSV files become a DataFrame (via csv_reader, for detector-specific
+    columns and types), JSON the parsed document and txt/log files a lazy
+    iterator of NDJSON records.
+    """
+    file_extension = file_format(filepath)
+
+    if file_extension == 'json':
+        return read_json(filepath)
+    elif file_extension == 'csv':
+        return csv_reader(filepath)
+    elif file_extension in ['txt', 'log']:
+        return iter_log_records(filepath)
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
@@ -1,43 +1,80 @@
 import json
-import csv
+import os
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import math
 
+import numpy as np
+import pandas as pd
+
+from ._kernels import count_matches, round_cells
+from .readers import read_csv, read_trace
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # optional; every PSN pair is compared instead
+    cKDTree = None
+
+# Per-sample tolerances of the trajectory clone check (x, y, spd, heading)
+# and the number of matching samples that makes two tracks clones
+PATH_MATCH_TOLERANCE = np.array([3, 3, 0.5, 0.3])
+MIN_MATCHING_SAMPLES = 5
+
+# Per-sample tolerances of the behavior clone check (spd, heading)
+BEHAVIOR_MATCH_TOLERANCE = np.array([1, 0.5])
+
+# Total findings that rate a file Critical; the rating can't rise past it
+CRITICAL_FINDINGS = 10
+
+# Candidate track pairs checked per kernel call, so capped checks stop early
+CANDIDATE_BATCH = 65536
+
 
 class SybilAttackDetector:
 
     def __init__(self):
         self.results = {}
+        self.cols = {}                    # numeric field -> float64 column
+        self.psn = np.empty(0, dtype=np.int64)   # per-row PSN code
+        self.psn_values = []              # PSN of each code, in order of first appearance
+        self.psn_order = np.empty(0, dtype=np.int64)   # row positions sorted by PSN code, stably
+        self.psn_lengths = np.empty(0, dtype=np.int64) # messages per PSN code
         self.threat_level = "Unknown"
         self.confidence_score = 0.0
 
     # ---------------------------------------------------------
     # MAIN ANALYSIS
     # ---------------------------------------------------------
-    def analyze(self, filepath: str) -> Dict[str, Any]:
+    def analyze(self, filepath: str, max_findings: Optional[int] = None) -> Dict[str, Any]:
+        """Run every Sybil check on a trace file.
+
+        By default each check lists everything it finds. With max_findings
+        (e.g. CRITICAL_FINDINGS for a quick triage) each check stops after
+        that many, which still rates the file the same.
+        """
 
         try:
             data = self._read_file(filepath)
 
-            # Convert numeric fields to float
-            data = self._normalize_data(data)
+            # Convert to float columns and integer PSN codes
+            self._normalize_data(data)
 
             # Step 1: Group messages by PSN
-            vehicles = self._group_by_psn(data)
+            self._group_by_psn()
 
             # Step 2: Detect cloned trajectories
-            cloned_nodes = self._detect_cloned_paths(vehicles)
+            tracks = self._build_tracks()
+            cloned_nodes = self._detect_cloned_paths(tracks, max_findings)
 
             # Step 3: Detect co-location conflicts
-            position_conflicts = self._detect_same_position_same_time(data)
+            position_conflicts = self._detect_same_position_same_time(max_findings)
 
             # Step 4: Detect identical behavior patterns
-            behavior_clones = self._detect_behavior_clones(vehicles)
+            behavior_clones = self._detect_behavior_clones(tracks, max_findings)
 
             # Build final results
             self.results = {
-                "total_unique_vehicles": len(vehicles),
+                "total_unique_vehicles": len(self.psn_values),
                 "cloned_trajectory_nodes": cloned_nodes,
                 "position_conflicts": position_conflicts,
                 "behavior_clones": behavior_clones,
@@ -64,134 +101,231 @@ class SybilAttackDetector:
     # ---------------------------------------------------------
     # READ FILE
     # ---------------------------------------------------------
-    def _read_file(self, filepath: str) -> Any:
-        ext = filepath.split('.')[-1].lower()
+    def _read_file(self, filepath: str) -> pd.DataFrame:
+        data = read_trace(filepath, csv_reader=self._read_csv)
 
-        if ext == 'csv':
-            with open(filepath, 'r') as f:
-                return list(csv.DictReader(f))
+        if isinstance(data, pd.DataFrame):
+            return data
+        return pd.DataFrame(list(data))
 
-        elif ext in ['txt', 'log']:
-            with open(filepath, 'r') as f:
-                return f.readlines()
+    # Fields the detectors do math on
+    NUMERIC_FIELDS = ("x", "y", "heading", "spd", "localtime", "instant_accel")
 
-        else:
-            raise ValueError("Unsupported format (use CSV)")
+    def _read_csv(self, filepath: str) -> pd.DataFrame:
+        """Parse only the PSN and numeric columns, typed by the C parser"""
+        if os.path.getsize(filepath) == 0:
+            # Nothing to map or parse, not even a header: no messages
+            return pd.DataFrame(columns=["PSN", *self.NUMERIC_FIELDS])
+        header = read_csv(filepath, nrows=0).columns
+        usecols = [c for c in header if c == "PSN" or c in self.NUMERIC_FIELDS]
+        dtypes = {c: (str if c == "PSN" else np.float64) for c in usecols}
+
+        try:
+            # Empty cells are NaN numbers but stay '' PSNs, like csv.DictReader
+            return read_csv(filepath, usecols=usecols, dtype=dtypes,
+                            na_values={c: [""] for c in usecols if c != "PSN"},
+                            keep_default_na=False)
+        except ValueError:
+            # A non-numeric cell somewhere: read everything as text and let
+            # _normalize_data coerce it
+            return read_csv(filepath, usecols=usecols, dtype=str, keep_default_na=False)
 
     # ---------------------------------------------------------
     # NORMALIZATION
     # ---------------------------------------------------------
-    def _normalize_data(self, rows):
-        """Convert numeric fields to floats for math operations"""
-        numeric_fields = ["x", "y", "heading", "spd", "localtime", "instant_accel"]
-
-        for row in rows:
-            for f in numeric_fields:
-                try:
-                    row[f] = float(row[f])
-                except:
-                    row[f] = None
-
-        return rows
+    def _normalize_data(self, frame: pd.DataFrame):
+        """Split the frame into one float column per numeric field (unparsable
+        or missing values become NaN) and an integer PSN code per row"""
+        self.cols = {}
+        for f in self.NUMERIC_FIELDS:
+            if f in frame:
+                self.cols[f] = pd.to_numeric(frame[f], errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                self.cols[f] = np.full(len(frame), np.nan)
+
+        codes, psns = pd.factorize(frame["PSN"], use_na_sentinel=False)
+        self.psn = codes.astype(np.int64)
+        self.psn_values = psns.tolist()
 
     # ---------------------------------------------------------
     # GROUP BY PSN
     # ---------------------------------------------------------
-    def _group_by_psn(self, data):
-        vehicles = {}
-        for row in data:
-            psn = row["PSN"]
-            vehicles.setdefault(psn, []).append(row)
-        return vehicles
+    def _group_by_psn(self):
+        """Order the rows by PSN code, keeping message order within a PSN.
+        PSN code k owns psn_order[start:start + psn_lengths[k]], where start
+        is the sum of the lengths before it."""
+        self.psn_order = np.argsort(self.psn, kind='stable')
+        self.psn_lengths = np.bincount(self.psn, minlength=len(self.psn_values)).astype(np.int64)
+
+    # Column layout of the per-vehicle track arrays
+    TRACK_FIELDS = ("x", "y", "spd", "heading")
+
+    def _build_tracks(self):
+        """All tracks, built once for every detector: a (rows x TRACK_FIELDS)
+        array of every message, grouped by PSN code and in message order
+        within a PSN, plus where each track starts in it and its length.
+        Missing values are NaN, which never passes a threshold check."""
+        order, lengths = self.psn_order, self.psn_lengths
+        values = np.column_stack([self.cols[f][order] for f in self.TRACK_FIELDS]) \
+            if len(order) else np.empty((0, len(self.TRACK_FIELDS)))
+        starts = np.cumsum(lengths) - lengths
+        return values, starts, lengths
 
     # ---------------------------------------------------------
     # 1. DETECT CLONED TRAJECTORIES (same path, different PSN)
     # ---------------------------------------------------------
-    def _detect_cloned_paths(self, vehicles) -> List:
-        cloned = []
-
-        psns = list(vehicles.keys())
-        n = len(psns)
-
-        for i in range(n):
-            for j in range(i + 1, n):
-
-                psn1, psn2 = psns[i], psns[j]
-                path1, path2 = vehicles[psn1], vehicles[psn2]
+    def _detect_cloned_paths(self, tracks, max_findings=None) -> List:
+        psns = self.psn_values
 
-                if self._paths_too_similar(path1, path2):
-                    cloned.append((psn1, psn2))
-
-        return cloned
-
-    def _paths_too_similar(self, p1, p2):
-        """Two vehicles moving with identical location-speed-heading = clone"""
-        count = 0
-
-        for r1, r2 in zip(p1, p2):
-            if abs(r1["x"] - r2["x"]) < 3 and \
-               abs(r1["y"] - r2["y"]) < 3 and \
-               abs(r1["spd"] - r2["spd"]) < 0.5 and \
-               abs(r1["heading"] - r2["heading"]) < 0.3:
-                count += 1
-
-        return count >= 5   # cloned if ≥5 matching samples
+        # Two vehicles moving with identical location-speed-heading = clone
+        cloned = []
+        for first, second, _ in self._matching_pairs(tracks, PATH_MATCH_TOLERANCE):
+            cloned += zip(first.tolist(), second.tolist())
+            if max_findings is not None and len(cloned) >= max_findings:
+                break
+
+        return [(psns[i], psns[j]) for i, j in cloned[:max_findings]]
+
+    def _matching_pairs(self, tracks, tolerance):
+        """Yield the track pairs with MIN_MATCHING_SAMPLES or more matching
+        samples, in order, one batch of candidates at a time: the pairs'
+        first and second tracks, and the first track of the batch's last
+        candidate (every pair of an earlier track has been checked)"""
+        values, starts, lengths = tracks
+        first, second = self._clone_candidates(values, starts, lengths, tolerance)
+
+        for k in range(0, len(first), CANDIDATE_BATCH):
+            batch_first, batch_second = first[k:k + CANDIDATE_BATCH], second[k:k + CANDIDATE_BATCH]
+            counts = count_matches(values, starts, lengths, batch_first, batch_second,
+                                   tolerance, MIN_MATCHING_SAMPLES)
+            matched = counts >= MIN_MATCHING_SAMPLES   # clones if ≥5 matching samples
+            yield batch_first[matched], batch_second[matched], int(batch_first[-1])
+
+    def _clone_candidates(self, values, starts, lengths, tolerance):
+        """Index pairs (first[k] < second[k], in order) of tracks that may be clones.
+
+        Scaled by the per-column tolerance, two samples match when their
+        Chebyshev distance is below 1. For every sample index a KD-tree
+        finds the tracks that match there, and only pairs matching at
+        MIN_MATCHING_SAMPLES or more indices are returned. That is a
+        superset of the clones, so the exact check sees every real one.
+        Without scipy every pair of long enough tracks is a candidate.
+        """
+        n = len(lengths)
+
+        # Tracks shorter than MIN_MATCHING_SAMPLES can't be clones of anything
+        eligible = np.flatnonzero(lengths >= MIN_MATCHING_SAMPLES)
+        if cKDTree is None or len(eligible) < 2:
+            first, second = np.triu_indices(len(eligible), 1)
+            return eligible[first], eligible[second]
+
+        # The eligible rows' tracks and sample indices; rows sorted by sample
+        # index (stably, so tracks stay in order) split into one run per index
+        track = np.repeat(np.arange(n), lengths)
+        rows = np.flatnonzero(lengths[track] >= MIN_MATCHING_SAMPLES)
+        rank = rows - starts[track[rows]]
+        by_rank = rows[np.argsort(rank, kind='stable')]
+        runs = np.split(by_rank, np.cumsum(np.bincount(rank))[:-1])
+
+        pair_keys = [np.empty(0, dtype=np.int64)]
+        for run in runs:
+            if len(run) < 2:
+                continue
+            sample = values[run]
+            kept = ~np.isnan(sample).any(axis=1)
+            members = track[run[kept]]
+            if len(members) < 2:
+                continue
+            # A hair over 1 so scaling round-off can't drop a true match
+            pairs = cKDTree(sample[kept] / tolerance).query_pairs(r=1 + 1e-9, p=np.inf, output_type='ndarray')
+            pair_keys.append(members[pairs[:, 0]] * n + members[pairs[:, 1]])
+
+        keys, counts = np.unique(np.concatenate(pair_keys), return_counts=True)
+        keys = keys[counts >= MIN_MATCHING_SAMPLES].astype(np.int64)
+        return keys // n, keys % n
 
     # ---------------------------------------------------------
     # 2. SAME LOCATION SAME TIME (IMPOSSIBLE - SYBIL)
     # ---------------------------------------------------------
-    def _detect_same_position_same_time(self, data):
+    def _detect_same_position_same_time(self, max_findings=None):
 
         suspicious = []
-        time_groups = {}
 
-        for row in data:
-            t = round(row["localtime"], 1)
-            time_groups.setdefault(t, []).append(row)
+        times = self.cols["localtime"]
+        xy = np.column_stack((self.cols["x"], self.cols["y"]))
+        psn_codes = self.psn
+        psns = self.psn_values
 
-        for t, rows in time_groups.items():
+        # Rows without a time or position can't overlap anything
+        valid = np.flatnonzero(~np.isnan(times) & ~np.isnan(xy).any(axis=1))
 
-            for i in range(len(rows)):
-                for j in range(i + 1, len(rows)):
-                    r1, r2 = rows[i], rows[j]
+        # Bucket by time rounded to 0.1s: factorize the integer tenths (in
+        # order of first appearance) and split one stable sort into buckets
+        codes, tenths = pd.factorize(round_cells(times[valid], 1))
+        order = np.argsort(codes, kind='stable')
+        buckets = np.split(valid[order], np.flatnonzero(np.diff(codes[order])) + 1)
 
-                    dist = math.dist((r1["x"], r1["y"]), (r2["x"], r2["y"]))
+        for tenth, rows in zip(tenths.tolist(), buckets):
+            t = tenth / 10
 
-                    if dist < 2 and r1["PSN"] != r2["PSN"]:  # two vehicles cannot overlap
-                        suspicious.append({
-                            "time": t,
-                            "psn1": r1["PSN"],
-                            "psn2": r2["PSN"],
-                            "distance": dist
-                        })
+            for i, j in self._close_pairs(xy[rows]):
+                r1, r2 = rows[i], rows[j]
 
-        return suspicious
+                dist = math.dist(xy[r1], xy[r2])
 
-    # ---------------------------------------------------------
-    # 3. SAME SPEED + SAME HEADING + SAME ACCEL → BEHAVIOR CLONES
-    # ---------------------------------------------------------
-    def _detect_behavior_clones(self, vehicles):
+                if dist < 2 and psn_codes[r1] != psn_codes[r2]:  # two vehicles cannot overlap
+                    suspicious.append({
+                        "time": t,
+                        "psn1": psns[psn_codes[r1]],
+                        "psn2": psns[psn_codes[r2]],
+                        "distance": dist
+                    })
+                    if len(suspicious) == max_findings:
+                        return suspicious
 
-        clones = []
+        return suspicious
 
-        for psn, rows in vehicles.items():
+    def _close_pairs(self, points):
+        """Index pairs (i < j, in order) of points about 2m apart or closer"""
+        if len(points) < 2:
+            return []
 
-            pattern = [(r["spd"], r["heading"], r["instant_accel"]) for r in rows]
+        # A hair over the limit so the exact check in the caller decides
+        limit = 2 + 1e-9
+        if cKDTree is not None:
+            pairs = cKDTree(points).query_pairs(r=limit, output_type='ndarray')
+            pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+            return pairs.tolist()
 
-            for psn2, rows2 in vehicles.items():
-                if psn == psn2:
-                    continue
+        i, j = np.triu_indices(len(points), 1)
+        close = np.hypot(*(points[i] - points[j]).T) < limit
+        return list(zip(i[close].tolist(), j[close].tolist()))
 
-                pattern2 = [(r["spd"], r["heading"], r["instant_accel"]) for r in rows2]
+    # ---------------------------------------------------------
+    # 3. SAME SPEED + SAME HEADING + SAME ACCEL → BEHAVIOR CLONES
+    # ---------------------------------------------------------
+    def _detect_behavior_clones(self, tracks, max_findings=None):
 
-                matches = sum(
-                    1 for (a, b) in zip(pattern, pattern2)
-                    if abs(a[0] - b[0]) < 1 and abs(a[1] - b[1]) < 0.5
-                )
+        clones = []
 
-                if matches >= 5:
-                    clones.append((psn, psn2))
-                    break
+        psns = self.psn_values
+        values, starts, lengths = tracks
+        tracks = (values[:, 2:4], starts, lengths)  # spd, heading
+
+        # Same speed and heading at enough samples = behavior clone.
+        # Each PSN is paired with the first other PSN (in file order) that
+        # matches it; pairs are sorted, so the first one seen is that PSN
+        partners = {}
+        for first, second, last in self._matching_pairs(tracks, BEHAVIOR_MATCH_TOLERANCE):
+            for i, j in zip(first.tolist(), second.tolist()):
+                partners.setdefault(i, j)
+                partners.setdefault(j, i)
+            # PSNs before `last` can't gain a partner or be outranked any more
+            if max_findings is not None and sum(i < last for i in partners) >= max_findings:
+                break
+
+        for i in sorted(partners)[:max_findings]:
+            clones.append((psns[i], psns[partners[i]]))
 
         return clones
 
@@ -201,7 +335,7 @@ class SybilAttackDetector:
     def _rate_threat_level(self, clones, position, behavior):
         total = len(clones) + len(position) + len(behavior)
 
-        if total >= 10:
+        if total >= CRITICAL_FINDINGS:
             return "Critical", 0.95
         elif total >= 5:
             return "High", 0.88
@@ -0,0 +1,18 @@
+# backend/gunicorn.conf.py
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app` from this directory
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# One process per core for the CPU-bound analyses; threads within each
+# process keep uploads and downloads from queueing behind one another
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Analyses can run for minutes on large traces (Config.ANALYSIS_TIMEOUT)
+timeout = 300
@@ -0,0 +1,29 @@
+# backend/utils/__init__.py
+"""
+Utility module for file handling and report generation
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .file_handler import FileHandler
+    from .pdf_generator import PDFReportGenerator
+    from .timestamps import format_now
+
+__all__ = ['FileHandler', 'PDFReportGenerator', 'format_now']
+
+# Imported on first access so file handling doesn't pay ReportLab's import cost
+_EXPORTS = {
+    'FileHandler': '.file_handler',
+    'PDFReportGenerator': '.pdf_generator',
+    'format_now': '.timestamps',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,103 @@
+import io
 import os
 import json
 import csv
-from typing import Any, Dict, List
+import hashlib
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, List, Tuple
 from werkzeug.utils import secure_filename
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib parser
+    orjson = None
+
 
 class FileHandler:
     """Utility class for handling file operations"""
     
-    def __init__(self, upload_folder: str):
+    def __init__(self, upload_folder: str, allowed_extensions=None):
         self.upload_folder = upload_folder
-        self.allowed_extensions = {'csv', 'json', 'txt', 'log', 'pcap'}
+        self.allowed_extensions = frozenset(
+            allowed_extensions or {'csv', 'json', 'txt', 'log', 'pcap'}
+        )
         
     def allowed_file(self, filename: str) -> bool:
         """Check if file extension is allowed"""
-        return '.' in filename and \
-               filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
+        _, dot, extension = filename.rpartition('.')
+        return bool(dot) and extension.lower() in self.allowed_extensions
+
+    def save_upload(self, file, filepath: str, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+        """Stream an uploaded file to disk in chunks, returning its SHA-256 hash and size"""
+        stream = file.stream
+
+        # Large uploads are already spooled to a temp file by Werkzeug: let the
+        # kernel copy it with sendfile(2) instead of cycling it through Python
+        fd = self._spooled_fileno(stream)
+        if fd is not None and hasattr(os, 'sendfile'):
+            stream.seek(0)
+            file_hash = self._hash_fileobj(stream, chunk_size)
+            size = os.fstat(fd).st_size
+            with open(filepath, 'wb') as out:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), fd, offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+            return file_hash, offset
+
+        sha256 = hashlib.sha256()
+        size = 0
+
+        with open(filepath, 'wb') as out:
+            if not hasattr(stream, 'readinto'):
+                for chunk in iter(lambda: stream.read(chunk_size), b''):
+                    out.write(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+                return sha256.hexdigest(), size
+
+            # Reuse one preallocated buffer for every chunk instead of
+            # allocating a fresh bytes object per read
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while True:
+                n = stream.readinto(buffer)
+                if not n:
+                    break
+                out.write(view[:n])
+                sha256.update(view[:n])
+                size += n
+        return sha256.hexdigest(), size
+
+    def hash_file(self, filepath: str, chunk_size: int = 1024 * 1024) -> str:
+        """Compute the SHA-256 hash of a file on disk"""
+        with open(filepath, 'rb') as f:
+            return self._hash_fileobj(f, chunk_size)
+
+    def _hash_fileobj(self, f, chunk_size: int) -> str:
+        """SHA-256 of a binary file object, read from its current position"""
+        if hasattr(hashlib, 'file_digest'):
+            # Python 3.11+: reads into a reused buffer and hashes with OpenSSL,
+            # which uses the SHA-NI instructions where the CPU has them
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+        sha256 = hashlib.sha256()
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _spooled_fileno(self, stream):
+        """File descriptor of an upload stream that lives on disk, else None"""
+        # _rolled is private; if it's ever missing, assume the upload is still
+        # in memory and copy it in chunks rather than force a rollover
+        if isinstance(stream, SpooledTemporaryFile) and not getattr(stream, '_rolled', False):
+            return None  # still in memory; fileno() would force a rollover
+        try:
+            return stream.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
     
     def get_file_extension(self, filename: str) -> str:
         """Get file extension"""
@@ -24,6 +106,10 @@ class FileHandler:
     def read_json_file(self, filepath: str) -> Dict:
         """Read JSON file"""
         try:
+            if orjson is not None:
+                # orjson parses the raw UTF-8 bytes, no str decode in between
+                with open(filepath, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(filepath, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
@@ -64,12 +150,16 @@ class FileHandler:
         import time
         current_time = time.time()
         
-        for filename in os.listdir(self.upload_folder):
-            filepath = os.path.join(self.upload_folder, filename)
-            if os.path.isfile(filepath):
-                file_age = current_time - os.path.getmtime(filepath)
-                if file_age > (max_age_hours * 3600):
-                    try:
-                        os.remove(filepath)
-                    except Exception as e:
-                        print(f"Error removing old file {filename}: {str(e)}")
\ No newline at end of file
+        max_age = max_age_hours * 3600
+
+        # scandir entries carry their file type and cache their stat, so each
+        # file costs one stat call instead of three
+        with os.scandir(self.upload_folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    file_age = current_time - entry.stat().st_mtime
+                    if file_age > max_age:
+                        try:
+                            os.remove(entry.path)
+                        except Exception as e:
+                            print(f"Error removing old file {entry.name}: {str(e)}")
\ No newline at end of file
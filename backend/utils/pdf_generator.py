@@ -1,53 +1,253 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
+import json
+import multiprocessing
 import os
-from typing import Dict, Any
+import re
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from .timestamps import format_now
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+# ReportLab is slow to import, so it is loaded by _load_reportlab() when the
+# first report is built rather than with this module; the names below are
+# filled in then
+colors = inch = letter = None
+SimpleDocTemplate = Table = TableStyle = Paragraph = Spacer = PageBreak = None
+cleanBlockQuotedText = None
+
+# Generated PDFs are written to backend/reports
+_REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports')
+
+# Rendered reports kept for re-downloads, as hard links in the reports
+# directory. A cached PDF carries the generation time of its first render, so
+# it is only reused for a few minutes
+_REPORT_CACHE_SIZE = 256
+_REPORT_CACHE_TTL = 10 * 60  # seconds
+
+# Report palette: title navy and the accent blue of headings and table headers
+_TITLE_COLOR = None
+_ACCENT_COLOR = None
+
+# Shared by every table; TableStyle only holds the commands, so one instance
+# can be applied to any number of tables
+_TABLE_STYLE = None
+
+
+@lru_cache(maxsize=1)
+def _load_reportlab():
+    """Import ReportLab and build the shared palette and table style, once per process"""
+    global colors, inch, letter, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    global cleanBlockQuotedText
+    global _TITLE_COLOR, _ACCENT_COLOR, _TABLE_STYLE
+
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.platypus.paragraph import cleanBlockQuotedText
+    from reportlab import rl_config
+
+    # Write compressed page streams as binary instead of also ASCII85-encoding
+    # them: smaller files and less encoding work. zlib itself already runs at
+    # its default level, and the reports are mostly text, so it stays on.
+    # ReportLab only reads this from its global config when it formats a
+    # stream (there is no per-document or per-canvas option), so it applies
+    # process-wide. That is acceptable here: this module is the only thing
+    # in the backend that produces PDFs, and dropping ASCII85 only changes
+    # how streams are armoured, not what any reader shows
+    rl_config.useA85 = 0
+
+    _TITLE_COLOR = colors.HexColor('#1e3a8a')
+    _ACCENT_COLOR = colors.HexColor('#2563eb')
+
+    _TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), _ACCENT_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+    ])
+
+
+@lru_cache(maxsize=1)
+def _reports_dir() -> str:
+    """The backend's reports directory, created on first use"""
+    os.makedirs(_REPORTS_DIR, exist_ok=True)
+    return _REPORTS_DIR
+
+
+@lru_cache(maxsize=None)
+def _plain_fragment(style):
+    """The fragment ReportLab's parser makes for plain text in style"""
+    return Paragraph("x", style).frags[0]
+
+
+def _paragraph(text: str, style) -> 'Paragraph':
+    """Paragraph(text, style), skipping the markup parser for plain text.
+
+    Text without tags or entities always parses to a single fragment
+    holding the whitespace-collapsed text, so that fragment is copied
+    from a per-style prototype instead.
+    """
+    if '<' in text or '>' in text or '&' in text or getattr(style, 'textTransform', None):
+        return Paragraph(text, style)
+    text = cleanBlockQuotedText(text)
+    if not text:
+        return Paragraph(text, style)
+    frag = _plain_fragment(style).clone(text=text, link=[], us_lines=[])
+    return Paragraph(text, style, frags=[frag])
+
+
+@lru_cache(maxsize=1)
+def _build_stylesheet():
+    """Build the sample stylesheet plus custom paragraph styles once per process"""
+    _load_reportlab()
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+
+    styles = getSampleStyleSheet()
+
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=_TITLE_COLOR,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+
+    # Section heading style
+    styles.add(ParagraphStyle(
+        name='SectionHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=_ACCENT_COLOR,
+        spaceAfter=12,
+        spaceBefore=12,
+        fontName='Helvetica-Bold'
+    ))
+
+    # Threat level style
+    styles.add(ParagraphStyle(
+        name='ThreatLevel',
+        parent=styles['Normal'],
+        fontSize=14,
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    ))
+
+    return styles
+
+
+# Color code per threat level; unrecognized levels are shown as Unknown
+_UNKNOWN_THREAT_COLOR = '#6b7280'
+_THREAT_COLORS = MappingProxyType({
+    'Low': '#22c55e',
+    'Medium': '#eab308',
+    'High': '#f97316',
+    'Critical': '#ef4444',
+    'Unknown': _UNKNOWN_THREAT_COLOR
+})
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Width of the page frame (letter less 1in margins), in inches
+_FRAME_WIDTH = 6.5
+
+# Affected lists longer than this are laid out as a grid of this many columns,
+# showing at most _AFFECTED_GRID_MAX entries and a count of the rest
+_AFFECTED_INLINE_MAX = 50
+_AFFECTED_COLUMNS = 4
+_AFFECTED_GRID_MAX = 200
+
+# Column widths in inches by column count, so ReportLab doesn't measure every
+# cell to size the columns. Two-column tables span the frame with room
+# for the longest label and a SHA-256 hex digest (4.45in at 9pt Helvetica,
+# plus cell padding); the third is hotspots
+_TABLE_COLUMN_WIDTHS = MappingProxyType({
+    2: (1.85, 4.65),
+    3: (1.6, 1.6, 1.6),
+})
+
+# Vertical gaps between report blocks (small, medium, large), in inches,
+# and the footer rule
+_GAP_HEIGHTS = (0.1, 0.2, 0.3)
+_DIVIDER_TEXT = "—" * 50
+
+# Leading 'YYYY-MM-DDTHH:MM:SS' of an ISO timestamp
+_ISO_SECONDS = re.compile(r'\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d')
+
+# What differs between the report types: the subtitle, the (label, findings
+# key) rows of the results and metrics tables, the (heading, findings key)
+# of the affected list, and whether geographic hotspots are shown
+_REPORT_LAYOUTS = MappingProxyType({
+    'sybil': {
+        'title': "Sybil Attack Forensic Report",
+        'results': (
+            ('Total Vehicles Analyzed', 'total_vehicles_analyzed'),
+            ('Suspicious Identities', 'suspicious_identities'),
+            ('Duplicate Behaviors Detected', 'duplicate_behaviors_detected'),
+            ('Network Anomalies', 'network_anomalies'),
+        ),
+        'affected': ("Affected Nodes", 'affected_nodes'),
+        'hotspots': False,
+        'metrics': (
+            ('Precision', 'precision'),
+            ('Recall', 'recall'),
+            ('F1 Score', 'f1_score'),
+        ),
+    },
+    'position': {
+        'title': "Position Falsification Forensic Report",
+        'results': (
+            ('Total Positions Analyzed', 'total_positions_analyzed'),
+            ('Anomalous Positions', 'anomalous_positions'),
+            ('Impossible Movements', 'impossible_movements'),
+            ('Speed Violations', 'speed_violations'),
+            ('Off-Road Positions', 'off_road_positions'),
+            ('GPS Spoofing Indicators', 'gps_spoofing_indicators'),
+        ),
+        'affected': ("Affected Vehicles", 'affected_vehicles'),
+        'hotspots': True,
+        'metrics': (
+            ('Precision', 'precision'),
+            ('Recall', 'recall'),
+            ('F1 Score', 'f1_score'),
+            ('False Positive Rate', 'false_positive_rate'),
+        ),
+    },
+})
 
 
 class PDFReportGenerator:
     """Generate PDF forensic reports with case details and file hash"""
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-        
-    def _setup_custom_styles(self):
-        """Setup custom paragraph styles"""
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1e3a8a'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Section heading style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeading',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#2563eb'),
-            spaceAfter=12,
-            spaceBefore=12,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Threat level style
-        self.styles.add(ParagraphStyle(
-            name='ThreatLevel',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        ))
+    @property
+    def styles(self):
+        # Styles are immutable after setup, so every generator shares one
+        # copy, built (with ReportLab loaded) for the first report
+        return _build_stylesheet()
     
     def generate_report(self, report_data: Dict[str, Any], report_type: str) -> str:
         """
@@ -58,329 +258,373 @@ class PDFReportGenerator:
             report_type: Type of report ('sybil' or 'position')
             
         Returns:
-            Path to generated PDF file
+            Path to generated PDF file (a link to the earlier render, dated
+            by that render, if this exact report was rendered in the last
+            _REPORT_CACHE_TTL seconds)
+        """
+        # One clock reading names the file and dates the report
+        now = datetime.now()
+        filepath = self._report_path(report_data, report_type, now)
+
+        # Re-downloads of the same report are served from the cache, linked
+        # out under their own name so evicting the entry can't pull the file
+        # from under this request
+        cache_path = os.path.join(_reports_dir(), f"cache_{self._cache_key(report_data, report_type)}.pdf")
+        try:
+            if time.time() - os.stat(cache_path).st_mtime < _REPORT_CACHE_TTL:
+                os.link(cache_path, filepath)
+                return filepath
+        except OSError:
+            pass  # not cached, just evicted, or the name is taken: render it
+
+        # Rendered under a temporary name and moved into place, so a report
+        # that reuses a name (same case within a second) is a new file rather
+        # than a rewrite of one that may be cached for other data. Created
+        # like any other file (not mkstemp's 0600) so the web server can
+        # send it
+        rendered = f"{filepath}.{uuid.uuid4().hex}.part"
+        os.close(os.open(rendered, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+        try:
+            self._write_report(report_data, report_type, rendered, now)
+        except Exception:
+            os.remove(rendered)
+            raise
+        self._cache_report(rendered, cache_path)
+        os.replace(rendered, filepath)
+        return filepath
+
+    def generate_reports_batch(self, reports: List[Tuple[Dict[str, Any], str]],
+                               max_workers: Optional[int] = None) -> List[str]:
         """
-        # Create reports directory if it doesn't exist
-        reports_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
-        os.makedirs(reports_dir, exist_ok=True)
+        Generate several PDF reports in parallel worker processes
         
+        Args:
+            reports: (report_data, report_type) pairs
+            max_workers: Worker processes (defaults to the CPU count)
+
+        Returns:
+            Paths to the generated PDF files, in the order of reports
+        """
+        # Paths are picked here so reports for the same case within the
+        # same second get distinct names
+        now = datetime.now()
+        filepaths = []
+        taken = set()
+        for report_data, report_type in reports:
+            filepath = self._report_path(report_data, report_type, now)
+            base, ext = os.path.splitext(filepath)
+            n = 1
+            while filepath in taken:
+                n += 1
+                filepath = f"{base}_{n}{ext}"
+            taken.add(filepath)
+            filepaths.append(filepath)
+
+        if len(reports) < 2:
+            for (report_data, report_type), filepath in zip(reports, filepaths):
+                self._write_report(report_data, report_type, filepath, now)
+            return filepaths
+
+        # doc.build is CPU-bound Python, so processes rather than threads.
+        # They come from a forkserver rather than being forked from a
+        # multi-threaded web worker
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('forkserver')) as executor:
+            datas, types = zip(*reports)
+            list(executor.map(_write_report_file, datas, types, filepaths, [now] * len(reports)))
+        return filepaths
+
+    def _cache_key(self, report_data: Dict[str, Any], report_type: str) -> str:
+        """Digest of the report type and canonical JSON of its data"""
+        if orjson is not None:
+            canonical = orjson.dumps(report_data, option=orjson.OPT_SORT_KEYS, default=str)
+        else:
+            canonical = json.dumps(report_data, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.blake2b(canonical + report_type.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _cache_report(self, rendered: str, cache_path: str):
+        """Make a freshly rendered report the cached copy, replacing an expired one"""
+        staging = f"{rendered}.cache"
+        try:
+            os.link(rendered, staging)
+        except OSError:
+            return  # no hard links here (or not permitted): the report just isn't cached
+        os.replace(staging, cache_path)
+        self._evict_cached_reports()
+
+    def _evict_cached_reports(self):
+        """Drop expired cached reports and the oldest beyond _REPORT_CACHE_SIZE"""
+        expired = time.time() - _REPORT_CACHE_TTL
+        with os.scandir(_reports_dir()) as entries:
+            cached = [(entry.stat().st_mtime, entry.path) for entry in entries
+                      if entry.name.startswith('cache_') and entry.is_file()]
+        cached.sort()
+        keep = min(_REPORT_CACHE_SIZE, sum(mtime >= expired for mtime, _ in cached))
+        for _, path in cached[:len(cached) - keep]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _report_path(self, report_data: Dict[str, Any], report_type: str,
+                     now: Optional[datetime] = None) -> str:
+        """Path of a new report file, named by type, case number and time"""
         # Generate filename with case number
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = now.strftime('%Y%m%d_%H%M%S') if now else format_now()
         case_num = str(report_data.get('caseNumber', 'UNKNOWN'))
         filename = f"Autoforensics_{report_type}_Case{case_num}_{timestamp}.pdf"
-        filepath = os.path.join(reports_dir, filename)
+        return os.path.join(_reports_dir(), filename)
+
+    def generate_report_bytes(self, report_data: Dict[str, Any], report_type: str) -> bytes:
+        """
+        Generate PDF report from analysis data in memory, without a file
         
-        # Create PDF document
-        doc = SimpleDocTemplate(filepath, pagesize=letter,
+        Args:
+            report_data: Dictionary containing report information
+            report_type: Type of report ('sybil' or 'position')
+
+        Returns:
+            The PDF document
+        """
+        buffer = io.BytesIO()
+        self._write_report(report_data, report_type, buffer, datetime.now())
+        return buffer.getvalue()
+
+    def _write_report(self, report_data: Dict[str, Any], report_type: str, target,
+                      now: Optional[datetime] = None):
+        """Render one report to target, a file path or a binary file object"""
+        story = self._build_story(report_data, report_type, now)
+        self._render(target, story)
+
+    def _build_story(self, report_data: Dict[str, Any], report_type: str,
+                     now: Optional[datetime] = None) -> list:
+        """Build story (content elements) from the report type's layout"""
+        layout = _REPORT_LAYOUTS.get(report_type)
+        if layout is None:
+            raise ValueError(f"Unknown report type: {report_type}")
+        return self._build_report(report_data, layout, now)
+
+    def _render(self, target, story: list):
+        """Lay out the story as a PDF document written to target"""
+        _load_reportlab()
+        doc = SimpleDocTemplate(target, pagesize=letter,
                               rightMargin=72, leftMargin=72,
                               topMargin=72, bottomMargin=72)
-        
-        # Build story (content elements)
-        story = []
-        
-        # Add content based on report type
-        if report_type == 'sybil':
-            story = self._build_sybil_report(report_data)
-        elif report_type == 'position':
-            story = self._build_position_report(report_data)
-        else:
-            raise ValueError(f"Unknown report type: {report_type}")
-        
-        # Build PDF
         doc.build(story)
-        
-        return filepath
     
     def _build_sybil_report(self, data: Dict) -> list:
         """Build content for Sybil Attack report"""
+        return self._build_report(data, _REPORT_LAYOUTS['sybil'])
+
+    def _build_position_report(self, data: Dict) -> list:
+        """Build content for Position Falsification report"""
+        return self._build_report(data, _REPORT_LAYOUTS['position'])
+
+    def _build_report(self, data: Dict, layout: Dict, now: Optional[datetime] = None) -> list:
+        """Build the report content for one report layout, dated now (the
+        current time by default)"""
+        _load_reportlab()
         story = []
+        generated = (now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
         
-        # Header
-        story.append(Paragraph("AUTOFORENSICS", self.styles['CustomTitle']))
-        story.append(Paragraph("Sybil Attack Forensic Report", self.styles['Heading2']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Case Information Table
-        story.append(Paragraph("Case Information", self.styles['SectionHeading']))
-        case_data = [
-            ['Field', 'Value'],
-            ['Case Number', str(data.get('caseNumber', 'N/A'))],
-            ['Case Date', str(data.get('caseDate', 'N/A'))],
-            ['Investigator Name', str(data.get('investigatorName', 'N/A'))],
-            ['Investigator Designation', str(data.get('investigatorDesignation', 'N/A'))],
-            ['Report Date', str(data.get('reportDate', datetime.now().strftime('%Y-%m-%d')))]
-        ]
-        story.append(self._create_styled_table(case_data))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Evidence File Information
-        story.append(Paragraph("Evidence File Information", self.styles['SectionHeading']))
-        file_data = [
-            ['Property', 'Value'],
-            ['File Name', str(data.get('filename', 'N/A'))],
-            ['File Size', self._format_file_size(data.get('file_size', 0))],
-            ['File Hash (SHA-256)', str(data.get('file_hash', 'N/A'))],
-            ['Report ID', str(data.get('report_id', 'N/A'))],
-            ['Analysis Timestamp', datetime.fromisoformat(data.get('analysis_timestamp', datetime.now().isoformat())).strftime('%Y-%m-%d %H:%M:%S')]
-        ]
-        story.append(self._create_styled_table(file_data))
-        story.append(Spacer(1, 0.3*inch))
+        # Look the common styles up once instead of for every paragraph
+        normal = self.styles['Normal']
+        section = self.styles['SectionHeading']
         
-        # Threat Level
-        threat_color = self._get_threat_color(data.get('threat_level', 'Unknown'))
-        threat_text = f"<font color='{threat_color}'>THREAT LEVEL: {data.get('threat_level', 'Unknown').upper()}</font>"
-        story.append(Paragraph(threat_text, self.styles['ThreatLevel']))
-        confidence = data.get('confidence_score', 0)
-        story.append(Paragraph(f"<b>Confidence Score:</b> {confidence*100:.1f}%", self.styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
+        # One spacer per size, reused wherever that gap appears in this story.
+        # Not shared between reports: ReportLab sets and clears layout
+        # attributes on flowables, and reports are built on several threads
+        gap_small, gap_medium, gap_large = (Spacer(1, h*inch) for h in _GAP_HEIGHTS)
         
-        # Executive Summary
-        story.append(Paragraph("Executive Summary", self.styles['SectionHeading']))
-        summary = data.get('summary', 'No summary available')
-        story.append(Paragraph(summary, self.styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
+        analysis_time = self._format_analysis_time(data.get('analysis_timestamp'), generated)
         
-        # Analysis Results
-        story.append(Paragraph("Analysis Results", self.styles['SectionHeading']))
-        findings = data.get('analysis_results', {}).get('findings', {})
-        
-        if findings:
-            results_data = [
-                ['Metric', 'Value'],
-                ['Total Vehicles Analyzed', str(findings.get('total_vehicles_analyzed', 'N/A'))],
-                ['Suspicious Identities', str(findings.get('suspicious_identities', 'N/A'))],
-                ['Duplicate Behaviors Detected', str(findings.get('duplicate_behaviors_detected', 'N/A'))],
-                ['Network Anomalies', str(findings.get('network_anomalies', 'N/A'))]
-            ]
-            story.append(self._create_styled_table(results_data))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Threat Indicators
-        threat_indicators = findings.get('threat_indicators', [])
-        if threat_indicators:
-            story.append(Paragraph("Threat Indicators", self.styles['SectionHeading']))
-            for indicator in threat_indicators:
-                story.append(Paragraph(f"• {indicator}", self.styles['Normal']))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Affected Nodes
-        affected_nodes = findings.get('affected_nodes', [])
-        if affected_nodes:
-            story.append(Paragraph("Affected Nodes", self.styles['SectionHeading']))
-            # Limit to first 50 nodes to avoid PDF overflow
-            nodes_to_display = affected_nodes[:50]
-            story.append(Paragraph(", ".join(nodes_to_display), self.styles['Normal']))
-            if len(affected_nodes) > 50:
-                story.append(Paragraph(f"... and {len(affected_nodes) - 50} more nodes", self.styles['Normal']))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Detection Metrics
-        metrics = findings.get('detection_metrics', {})
-        if metrics:
-            story.append(Paragraph("Detection Metrics", self.styles['SectionHeading']))
-            metrics_data = [
-                ['Metric', 'Score'],
-                ['Precision', f"{metrics.get('precision', 0):.2f}"],
-                ['Recall', f"{metrics.get('recall', 0):.2f}"],
-                ['F1 Score', f"{metrics.get('f1_score', 0):.2f}"]
-            ]
-            story.append(self._create_styled_table(metrics_data))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Recommendations
-        story.append(PageBreak())
-        story.append(Paragraph("Security Recommendations", self.styles['SectionHeading']))
-        recommendations = data.get('recommendations', [])
-        for i, rec in enumerate(recommendations, 1):
-            story.append(Paragraph(f"{i}. {rec}", self.styles['Normal']))
-            story.append(Spacer(1, 0.1*inch))
-        
-        # Footer
-        story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph("—" * 50, self.styles['Normal']))
-        story.append(Paragraph(
-            f"Report generated by Autoforensics on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            self.styles['Normal']
-        ))
-        story.append(Paragraph(
-            f"Investigator: {data.get('investigatorName', 'N/A')} ({data.get('investigatorDesignation', 'N/A')})",
-            self.styles['Normal']
-        ))
-        
-        return story
-    
-    def _build_position_report(self, data: Dict) -> list:
-        """Build content for Position Falsification report"""
-        story = []
+        threat = data.get('threat_level', 'Unknown')
+        # Analyses that failed or were never run have no findings
+        findings = (data.get('analysis_results') or {}).get('findings') or {}
         
         # Header
-        story.append(Paragraph("AUTOFORENSICS", self.styles['CustomTitle']))
-        story.append(Paragraph("Position Falsification Forensic Report", self.styles['Heading2']))
-        story.append(Spacer(1, 0.3*inch))
+        story.extend([
+            _paragraph("AUTOFORENSICS", self.styles['CustomTitle']),
+            _paragraph(layout['title'], self.styles['Heading2']),
+            gap_large,
+        ])
         
         # Case Information Table
-        story.append(Paragraph("Case Information", self.styles['SectionHeading']))
         case_data = [
             ['Field', 'Value'],
             ['Case Number', str(data.get('caseNumber', 'N/A'))],
             ['Case Date', str(data.get('caseDate', 'N/A'))],
             ['Investigator Name', str(data.get('investigatorName', 'N/A'))],
             ['Investigator Designation', str(data.get('investigatorDesignation', 'N/A'))],
-            ['Report Date', str(data.get('reportDate', datetime.now().strftime('%Y-%m-%d')))]
+            ['Report Date', str(data['reportDate']) if 'reportDate' in data else generated[:10]]
         ]
-        story.append(self._create_styled_table(case_data))
-        story.append(Spacer(1, 0.3*inch))
+        story.extend([
+            _paragraph("Case Information", section),
+            self._create_styled_table(case_data),
+            gap_large,
+        ])
         
         # Evidence File Information
-        story.append(Paragraph("Evidence File Information", self.styles['SectionHeading']))
         file_data = [
             ['Property', 'Value'],
             ['File Name', str(data.get('filename', 'N/A'))],
             ['File Size', self._format_file_size(data.get('file_size', 0))],
             ['File Hash (SHA-256)', str(data.get('file_hash', 'N/A'))],
             ['Report ID', str(data.get('report_id', 'N/A'))],
-            ['Analysis Timestamp', datetime.fromisoformat(data.get('analysis_timestamp', datetime.now().isoformat())).strftime('%Y-%m-%d %H:%M:%S')]
+            ['Analysis Timestamp', analysis_time]
         ]
-        story.append(self._create_styled_table(file_data))
-        story.append(Spacer(1, 0.3*inch))
+        story.extend([
+            _paragraph("Evidence File Information", section),
+            self._create_styled_table(file_data),
+            gap_large,
+        ])
         
         # Threat Level
-        threat_color = self._get_threat_color(data.get('threat_level', 'Unknown'))
-        threat_text = f"<font color='{threat_color}'>THREAT LEVEL: {data.get('threat_level', 'Unknown').upper()}</font>"
-        story.append(Paragraph(threat_text, self.styles['ThreatLevel']))
+        threat_color = _THREAT_COLORS.get(threat, _UNKNOWN_THREAT_COLOR)
+        threat_text = f"<font color='{threat_color}'>THREAT LEVEL: {threat.upper()}</font>"
         confidence = data.get('confidence_score', 0)
-        story.append(Paragraph(f"<b>Confidence Score:</b> {confidence*100:.1f}%", self.styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
+        story.extend([
+            _paragraph(threat_text, self.styles['ThreatLevel']),
+            _paragraph(f"<b>Confidence Score:</b> {confidence*100:.1f}%", normal),
+            gap_medium,
+        ])
         
         # Executive Summary
-        story.append(Paragraph("Executive Summary", self.styles['SectionHeading']))
         summary = data.get('summary', 'No summary available')
-        story.append(Paragraph(summary, self.styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
+        story.extend([
+            _paragraph("Executive Summary", section),
+            _paragraph(summary, normal),
+            gap_medium,
+        ])
         
         # Analysis Results
-        story.append(Paragraph("Analysis Results", self.styles['SectionHeading']))
-        findings = data.get('analysis_results', {}).get('findings', {})
+        story.append(_paragraph("Analysis Results", section))
         
         if findings:
-            results_data = [
-                ['Metric', 'Value'],
-                ['Total Positions Analyzed', str(findings.get('total_positions_analyzed', 'N/A'))],
-                ['Anomalous Positions', str(findings.get('anomalous_positions', 'N/A'))],
-                ['Impossible Movements', str(findings.get('impossible_movements', 'N/A'))],
-                ['Speed Violations', str(findings.get('speed_violations', 'N/A'))],
-                ['Off-Road Positions', str(findings.get('off_road_positions', 'N/A'))],
-                ['GPS Spoofing Indicators', str(findings.get('gps_spoofing_indicators', 'N/A'))]
-            ]
-            story.append(self._create_styled_table(results_data))
-            story.append(Spacer(1, 0.2*inch))
+            results_data = [['Metric', 'Value']]
+            results_data += [[label, str(findings.get(key, 'N/A'))] for label, key in layout['results']]
+            story.extend([self._create_styled_table(results_data), gap_medium])
         
         # Threat Indicators
         threat_indicators = findings.get('threat_indicators', [])
         if threat_indicators:
-            story.append(Paragraph("Threat Indicators", self.styles['SectionHeading']))
-            for indicator in threat_indicators:
-                story.append(Paragraph(f"• {indicator}", self.styles['Normal']))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Affected Vehicles
-        affected_vehicles = findings.get('affected_vehicles', [])
-        if affected_vehicles:
-            story.append(Paragraph("Affected Vehicles", self.styles['SectionHeading']))
-            vehicles_to_display = affected_vehicles[:50]
-            story.append(Paragraph(", ".join(vehicles_to_display), self.styles['Normal']))
-            if len(affected_vehicles) > 50:
-                story.append(Paragraph(f"... and {len(affected_vehicles) - 50} more vehicles", self.styles['Normal']))
-            story.append(Spacer(1, 0.2*inch))
+            # One paragraph with a line per indicator; they sit flush, so
+            # this lays out the same as a paragraph each
+            story.extend([
+                _paragraph("Threat Indicators", section),
+                _paragraph("<br/>".join([f"• {indicator}" for indicator in threat_indicators]), normal),
+                gap_medium,
+            ])
+
+        # Affected Nodes / Vehicles
+        heading, key = layout['affected']
+        affected = findings.get(key, [])
+        if affected:
+            story.append(_paragraph(heading, section))
+            if len(affected) > _AFFECTED_INLINE_MAX:
+                # Long lists go in a grid, which lays out and splits across
+                # pages row by row instead of re-wrapping one huge paragraph
+                shown = affected[:_AFFECTED_GRID_MAX]
+                rows = [shown[i:i + _AFFECTED_COLUMNS]
+                        for i in range(0, len(shown), _AFFECTED_COLUMNS)]
+                width = _FRAME_WIDTH / _AFFECTED_COLUMNS * inch
+                story.append(Table(rows, colWidths=[width] * _AFFECTED_COLUMNS, hAlign='LEFT'))
+                if len(affected) > len(shown):
+                    story.append(_paragraph(f"... and {len(affected) - len(shown)} more", normal))
+            else:
+                story.append(_paragraph(", ".join(affected), normal))
+            story.append(gap_medium)
         
         # Geographic Hotspots
-        hotspots = findings.get('geographic_hotspots', [])
+        hotspots = findings.get('geographic_hotspots', []) if layout['hotspots'] else []
         if hotspots:
-            story.append(Paragraph("Geographic Hotspots", self.styles['SectionHeading']))
             hotspot_data = [['Latitude', 'Longitude', 'Incident Count']]
-            for spot in hotspots:
-                hotspot_data.append([
+            hotspot_data += [
+                [
                     f"{spot.get('lat', 'N/A'):.4f}",
                     f"{spot.get('lon', 'N/A'):.4f}",
                     str(spot.get('incident_count', 'N/A'))
-                ])
-            story.append(self._create_styled_table(hotspot_data))
-            story.append(Spacer(1, 0.2*inch))
+                ]
+                for spot in hotspots
+            ]
+            story.extend([
+                _paragraph("Geographic Hotspots", section),
+                self._create_styled_table(hotspot_data),
+                gap_medium,
+            ])
         
         # Detection Metrics
         metrics = findings.get('detection_metrics', {})
         if metrics:
-            story.append(Paragraph("Detection Metrics", self.styles['SectionHeading']))
-            metrics_data = [
-                ['Metric', 'Score'],
-                ['Precision', f"{metrics.get('precision', 0):.2f}"],
-                ['Recall', f"{metrics.get('recall', 0):.2f}"],
-                ['F1 Score', f"{metrics.get('f1_score', 0):.2f}"],
-                ['False Positive Rate', f"{metrics.get('false_positive_rate', 0):.2f}"]
-            ]
-            story.append(self._create_styled_table(metrics_data))
-            story.append(Spacer(1, 0.2*inch))
+            metrics_data = [['Metric', 'Score']]
+            metrics_data += [[label, self._format_score(metrics.get(key))] for label, key in layout['metrics']]
+            story.extend([
+                _paragraph("Detection Metrics", section),
+                self._create_styled_table(metrics_data),
+                gap_medium,
+            ])
         
         # Recommendations
-        story.append(PageBreak())
-        story.append(Paragraph("Security Recommendations", self.styles['SectionHeading']))
+        story.extend([PageBreak(), _paragraph("Security Recommendations", section)])
         recommendations = data.get('recommendations', [])
-        for i, rec in enumerate(recommendations, 1):
-            story.append(Paragraph(f"{i}. {rec}", self.styles['Normal']))
-            story.append(Spacer(1, 0.1*inch))
+        story.extend([
+            flowable
+            for i, rec in enumerate(recommendations, 1)
+            for flowable in (_paragraph(f"{i}. {rec}", normal), gap_small)
+        ])
         
         # Footer
-        story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph("—" * 50, self.styles['Normal']))
-        story.append(Paragraph(
-            f"Report generated by Autoforensics on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            self.styles['Normal']
-        ))
-        story.append(Paragraph(
-            f"Investigator: {data.get('investigatorName', 'N/A')} ({data.get('investigatorDesignation', 'N/A')})",
-            self.styles['Normal']
-        ))
-        
+        story.extend([
+            gap_large,
+            _paragraph(_DIVIDER_TEXT, normal),
+            _paragraph(f"Report generated by Autoforensics on {generated}", normal),
+            _paragraph(
+                f"Investigator: {data.get('investigatorName', 'N/A')} ({data.get('investigatorDesignation', 'N/A')})",
+                normal
+            ),
+        ])
+
         return story
     
-    def _create_styled_table(self, data: list) -> Table:
+    def _format_analysis_time(self, timestamp: Optional[str], generated: str) -> str:
+        """Format an ISO timestamp as 'YYYY-MM-DD HH:MM:SS' (the report's
+        generated time if missing)"""
+        if not timestamp:
+            return generated
+        # ISO timestamps with seconds already start with the wanted text,
+        # so only parse the shorter or unusual forms
+        if _ISO_SECONDS.match(timestamp):
+            return timestamp[:19].replace('T', ' ')
+        return datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+    def _create_styled_table(self, data: list) -> 'Table':
         """Create a styled table"""
-        table = Table(data, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-        ]))
+        widths = _TABLE_COLUMN_WIDTHS.get(len(data[0]))
+        table = Table(data, colWidths=[w*inch for w in widths] if widths else None, hAlign='LEFT')
+        table.setStyle(_TABLE_STYLE)
         return table
     
     def _get_threat_color(self, threat_level: str) -> str:
         """Get color code for threat level"""
-        colors_map = {
-            'Low': '#22c55e',
-            'Medium': '#eab308',
-            'High': '#f97316',
-            'Critical': '#ef4444',
-            'Unknown': '#6b7280'
-        }
-        return colors_map.get(threat_level, colors_map['Unknown'])
+        return _THREAT_COLORS.get(threat_level, _UNKNOWN_THREAT_COLOR)
+
+    def _format_score(self, score) -> str:
+        """Format a detection metric to two decimals, N/A when it is missing"""
+        if score is None:
+            return "N/A"
+        return f"{score:.2f}"
     
     def _format_file_size(self, bytes_size: int) -> str:
         """Format file size in human-readable format"""
         try:
             bytes_size = int(bytes_size)
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if bytes_size < 1024.0:
-                    return f"{bytes_size:.2f} {unit}"
-                bytes_size /= 1024.0
-            return f"{bytes_size:.2f} TB"
-        except:
-            return "N/A"
\ No newline at end of file
+        except (TypeError, ValueError):
+            return "N/A"
+        # Each unit is 2**10 of the previous one, so the bit length picks it
+        unit = min((bytes_size.bit_length() - 1) // 10, 4) if bytes_size >= 1024 else 0
+        return f"{bytes_size / 1024 ** unit:.2f} {_SIZE_UNITS[unit]}"
+
+
+def _write_report_file(report_data: Dict[str, Any], report_type: str, filepath: str, now: datetime):
+    """Render one report in a batch worker process"""
+    PDFReportGenerator()._write_report(report_data, report_type, filepath, now)
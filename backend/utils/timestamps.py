@@ -0,0 +1,16 @@
+import time
+from typing import Dict, Tuple
+
+
+# fmt -> (epoch second, formatted string)
+_formatted: Dict[str, Tuple[int, str]] = {}
+
+
+def format_now(fmt: str = '%Y%m%d_%H%M%S') -> str:
+    """Format the current local time, reusing the result within the same second"""
+    second = int(time.time())
+    cached = _formatted.get(fmt)
+    if cached is None or cached[0] != second:
+        cached = (second, time.strftime(fmt, time.localtime(second)))
+        _formatted[fmt] = cached
+    return cached[1]